@@ -0,0 +1,420 @@
+"""
+Benchmark offline del pipeline de Moderation.on_message.
+
+No se conecta a Discord ni a MongoDB: usa mensajes sintéticos con la forma de discord.Message
+y una base de datos en memoria con la misma interfaz que usa el cog (find_one, update_one, ...).
+
+Uso:
+    python benchmarks/bench_moderation.py            # matriz completa
+    python benchmarks/bench_moderation.py --quick    # matriz reducida para pruebas rápidas
+
+Los resultados se guardan en benchmarks/results/ (un JSON por ejecución, con el commit actual)
+y se comparan con la ejecución anterior para detectar regresiones.
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from cogs.moderation import Moderation # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+WORD_COUNTS = [10, 1000, 10000]
+LINK_COUNTS = [0, 100, 1000]
+AUTHOR_COUNTS = [1000, 100000]
+
+VOCABULARY = [
+    "hola", "curso", "python", "tarea", "clase", "profesor", "examen", "duda", "ayuda", "proyecto",
+    "discord", "academia", "lección", "video", "ejercicio", "código", "error", "función", "variable", "bucle",
+    "gracias", "mañana", "semana", "nota", "entrega", "grupo", "canal", "servidor", "pregunta", "respuesta",
+    "datos", "archivo", "módulo", "clase", "objeto", "lista", "diccionario", "texto", "número", "resultado",
+]
+
+
+# --- Base de datos en memoria ---
+class FakeResult:
+    def __init__(self, modified_count=0, upserted_id=None):
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+def _matches(doc, query):
+    for key, expected in query.items():
+        value = doc.get(key)
+        if isinstance(expected, dict) and any(k.startswith("$") for k in expected):
+            for op, operand in expected.items():
+                if op == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+        elif value != expected:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return dict(next(self._iter))
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def _find(self, query):
+        if "_id" in query and not isinstance(query["_id"], dict):
+            doc = self.docs.get(query["_id"])
+            return [doc] if doc is not None and _matches(doc, query) else []
+        return [doc for doc in self.docs.values() if _matches(doc, query)]
+
+    def _apply(self, doc, update):
+        modified = False
+        for key, value in update.get("$set", {}).items():
+            if doc.get(key) != value:
+                doc[key] = value
+                modified = True
+        for key, value in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + value
+            modified = True
+        for key, value in update.get("$addToSet", {}).items():
+            values = doc.setdefault(key, [])
+            if value not in values:
+                values.append(value)
+                modified = True
+        for key, value in update.get("$pull", {}).items():
+            values = doc.get(key, [])
+            if value in values:
+                values.remove(value)
+                modified = True
+        for key in update.get("$unset", {}):
+            if key in doc:
+                del doc[key]
+                modified = True
+        return modified
+
+    def _upsert(self, query, update):
+        doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+        doc.setdefault("_id", query.get("_id"))
+        self._apply(doc, update)
+        self.docs[doc["_id"]] = doc
+        return doc
+
+    async def find_one(self, query):
+        found = self._find(query)
+        return dict(found[0]) if found else None
+
+    def find(self, query=None):
+        return FakeCursor(self._find(query or {}))
+
+    async def update_one(self, query, update, upsert=False):
+        found = self._find(query)
+        if found:
+            return FakeResult(modified_count=int(self._apply(found[0], update)))
+        if upsert:
+            doc = self._upsert(query, update)
+            return FakeResult(upserted_id=doc["_id"])
+        return FakeResult()
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False):
+        found = self._find(query)
+        if found:
+            before = dict(found[0])
+            self._apply(found[0], update)
+            return dict(found[0]) if return_document else before
+        if upsert:
+            doc = self._upsert(query, update)
+            return dict(doc) if return_document else None
+        return None
+
+    async def delete_one(self, query):
+        for doc in self._find(query):
+            del self.docs[doc["_id"]]
+            break
+
+    async def create_index(self, *args, **kwargs):
+        return None
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self.collections.setdefault(name, FakeCollection())
+
+
+# --- Objetos con la forma de discord.py ---
+class FakeRole:
+    def __init__(self, role_id, name):
+        self.id = role_id
+        self.name = name
+        self.position = 1
+
+
+class FakeChannel:
+    def __init__(self, channel_id, name):
+        self.id = channel_id
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.roles = [FakeRole(1, "@everyone"), FakeRole(2, "Muted")]
+        self.members = {}
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+    def get_role(self, role_id):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+
+class FakeMember:
+    def __init__(self, user_id, guild):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.guild = guild
+        self.roles = []
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.roles = [r for r in self.roles if r not in roles]
+
+
+class FakeMessage:
+    __slots__ = ("content", "author", "guild", "channel", "jump_url")
+
+    def __init__(self, content, author, guild, channel):
+        self.content = content
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+        self.jump_url = f"https://discord.com/channels/{guild.id}/{channel.id}/0"
+
+    async def delete(self):
+        pass
+
+
+class FakeBot:
+    def __init__(self, db, log_channel):
+        self.db = db
+        self.user = object()
+        self.log_channel = log_channel
+
+    def get_channel(self, channel_id):
+        return self.log_channel if channel_id == self.log_channel.id else None
+
+    def get_guild(self, guild_id):
+        return None
+
+    async def process_commands(self, message):
+        pass
+
+    async def wait_until_ready(self):
+        pass
+
+
+# --- Generación de escenarios ---
+def build_messages(rng, count, authors, guild, channel, prohibited_words, allowed_links):
+    """
+    Mezcla realista: ~90% texto limpio, ~5% enlace permitido, ~3% enlace no permitido, ~2% palabra prohibida.
+    Los primeros `authors` mensajes recorren a todos los autores en orden aleatorio, así que cada uno escribe
+    al menos una vez (`count` debe ser >= `authors`); el resto se reparte al azar.
+    """
+    members = {}
+    messages = []
+    first_authors = list(range(1, authors + 1))
+    rng.shuffle(first_authors)
+    for i in range(count):
+        user_id = first_authors[i] if i < authors else rng.randrange(authors) + 1
+        member = members.get(user_id)
+        if member is None:
+            member = members[user_id] = FakeMember(user_id, guild)
+            guild.members[user_id] = member
+        text = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(4, 14)))
+        roll = rng.random()
+        if roll < 0.05 and allowed_links:
+            text += f" https://{rng.choice(allowed_links)}video{rng.randrange(1000)}"
+        elif roll < 0.08:
+            text += f" https://spam-{rng.randrange(1000)}.example.com/gratis"
+        elif roll < 0.10 and prohibited_words:
+            text += f" {rng.choice(prohibited_words)}"
+        messages.append(FakeMessage(text, member, guild, channel))
+    return messages
+
+
+async def run_scenario(words, links, authors, message_count, measure_memory, seed=1234):
+    rng = random.Random(seed)
+    prohibited_words = [f"prohibida{i:05d}" for i in range(words)]
+    allowed_links = [f"sitio{i:04d}.com/" for i in range(links)]
+
+    db = FakeDatabase()
+    guild = FakeGuild(1)
+    log_channel = FakeChannel(10, "mod-logs")
+    channel = FakeChannel(20, "general")
+    await db.moderation_settings.update_one(
+        {"_id": guild.id},
+        {"$set": {"prohibited_words": prohibited_words, "allowed_links": allowed_links, "log_channel_id": log_channel.id}},
+        upsert=True
+    )
+    # Con menos mensajes que autores, el escenario no tendría tantos autores como dice su etiqueta
+    message_count = max(message_count, authors)
+    messages = build_messages(rng, message_count, authors, guild, channel, prohibited_words, allowed_links)
+
+    if measure_memory:
+        tracemalloc.start()
+    cog = Moderation(FakeBot(db, log_channel))
+    latencies = []
+    perf_counter = time.perf_counter
+    started = perf_counter()
+    for message in messages:
+        t0 = perf_counter()
+        await cog.on_message(message)
+        latencies.append(perf_counter() - t0)
+    elapsed = perf_counter() - started
+
+    memory = None
+    if measure_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"current_bytes": current, "peak_bytes": peak}
+
+    for sink in cog.log_sinks.values():
+        sink.stop()
+
+    latencies.sort()
+    return {
+        "prohibited_words": words,
+        "allowed_links": links,
+        "authors": authors,
+        "messages": message_count,
+        "messages_per_second": round(message_count / elapsed, 1),
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6, 1),
+        "mean_us": round(statistics.fmean(latencies) * 1e6, 1),
+        "spam_tracker_entries": len(cog.spam_tracker),
+        "spam_tracker_bytes": cog.spam_tracker.memory_bytes(),
+        "memory": memory,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "desconocido"
+
+
+def scenario_key(result):
+    return (result["prohibited_words"], result["allowed_links"], result["authors"])
+
+
+def load_previous():
+    if not RESULTS_DIR.exists():
+        return None
+    files = sorted(RESULTS_DIR.glob("*.json"))
+    if not files:
+        return None
+    with open(files[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(results, revision):
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = RESULTS_DIR / f"{stamp}-{revision}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"revision": revision, "created_at": stamp, "python": sys.version.split()[0], "results": results}, f, indent=2)
+    return path
+
+
+def print_table(results, previous):
+    previous_by_key = {scenario_key(r): r for r in previous["results"]} if previous else {}
+    header = f"{'palabras':>8} {'enlaces':>7} {'autores':>7} {'msg/s':>10} {'p50 µs':>8} {'p99 µs':>8} {'mem KiB':>9} {'Δ msg/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        memory = f"{r['memory']['current_bytes'] / 1024:.0f}" if r["memory"] else "-"
+        delta = "-"
+        before = previous_by_key.get(scenario_key(r))
+        if before:
+            delta = f"{(r['messages_per_second'] / before['messages_per_second'] - 1) * 100:+.1f}%"
+        print(f"{r['prohibited_words']:>8} {r['allowed_links']:>7} {r['authors']:>7} {r['messages_per_second']:>10} {r['p50_us']:>8} {r['p99_us']:>8} {memory:>9} {delta:>9}")
+    if previous:
+        print(f"\nComparado con la ejecución {previous['created_at']} (commit {previous['revision']}).")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de Moderation.on_message.")
+    parser.add_argument("--messages", type=int, default=20000, help="Mensajes por escenario (como mínimo, uno por autor).")
+    parser.add_argument("--quick", action="store_true", help="Matriz reducida y menos mensajes.")
+    parser.add_argument("--no-memory", action="store_true", help="No medir memoria con tracemalloc (más rápido).")
+    parser.add_argument("--no-save", action="store_true", help="No guardar los resultados en benchmarks/results/.")
+    args = parser.parse_args()
+
+    word_counts, link_counts, author_counts, message_count = WORD_COUNTS, LINK_COUNTS, AUTHOR_COUNTS, args.messages
+    if args.quick:
+        word_counts, link_counts, author_counts, message_count = [10, 1000], [0, 100], [1000], min(args.messages, 2000)
+
+    results = []
+    for words, links, authors in itertools.product(word_counts, link_counts, author_counts):
+        # La medición de tiempos y la de memoria van por separado: tracemalloc distorsiona los tiempos
+        result = await run_scenario(words, links, authors, message_count, measure_memory=False)
+        if not args.no_memory:
+            result["memory"] = (await run_scenario(words, links, authors, message_count, measure_memory=True))["memory"]
+        results.append(result)
+        print(f"· {words} palabras, {links} enlaces, {authors} autores: {result['messages_per_second']} msg/s", file=sys.stderr)
+
+    previous = load_previous()
+    print_table(results, previous)
+    if not args.no_save:
+        path = save_results(results, git_revision())
+        print(f"Resultados guardados en {os.path.relpath(path, ROOT)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
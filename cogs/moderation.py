@@ -1,23 +1,527 @@
 import discord
 from discord.ext import commands
 import re
+import sys
 import time
 import asyncio
+import datetime
+from collections import deque, OrderedDict
 from discord import app_commands
-
-spam_detection = {}
-recent_messages = {}
+from pymongo import ReturnDocument
+from utils.scheduling import DeadlineScheduler, as_utc
 
 SPAM_THRESHOLD_TIME = 5
 SPAM_THRESHOLD_COUNT = 5
 SPAM_REPETITION_THRESHOLD = 3
 
+# Límites del estado de detección de spam en memoria
+SPAM_IDLE_EVICTION_SECONDS = 300 # Se olvida a un usuario tras 5 minutos sin escribir
+SPAM_MAX_TRACKED_USERS = 50000 # Tope duro de usuarios seguidos a la vez (se expulsa al menos reciente)
+
 MAX_WARNINGS_BEFORE_MUTE = 3
 MUTE_DURATION_SECONDS = 600
 
+# Detección de raids (mismo contenido enviado por muchos usuarios distintos)
+RAID_WINDOW_SECONDS = 30 # Ventana en la que se comparan los mensajes del servidor
+RAID_DISTINCT_USERS = 8 # Usuarios distintos con el mismo contenido para activar el modo raid
+RAID_MIN_CONTENT_LENGTH = 12 # Longitud mínima (normalizada) de un mensaje con enlaces o menciones; evita "hola", "gg", etc.
+RAID_MIN_PLAIN_CONTENT_LENGTH = 40 # Longitud mínima (normalizada) de un mensaje sin enlaces ni menciones
+RAID_MODE_DURATION = 300 # Segundos que dura el modo raid desde el último mensaje bloqueado
+RAID_MAX_ENTRIES_PER_GUILD = 5000 # Tope de mensajes recordados por servidor dentro de la ventana
+
+
+# --- Buscador compilado de palabras prohibidas ---
+class ProhibitedWordMatcher:
+    """
+    Compila la lista de palabras prohibidas de un servidor en una única expresión regular.
+    Las palabras se organizan como un trie (prefijos compartidos) para que la búsqueda
+    no dependa del tamaño de la lista, y el grupo capturado indica qué palabra coincidió.
+    """
+    def __init__(self, words):
+        self.words = sorted({w.lower().strip() for w in words if w and w.strip()})
+        self.pattern = None
+        if self.words:
+            self.pattern = re.compile(r'\b(' + self._build_trie_pattern(self.words) + r')\b')
+
+    @staticmethod
+    def _build_trie_pattern(words):
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[""] = True # Marca de fin de palabra
+
+        def to_pattern(node):
+            is_end = "" in node
+            branches = [re.escape(char) + to_pattern(child) for char, child in sorted(node.items()) if char != ""]
+            if not branches:
+                return ""
+            if len(branches) == 1 and not is_end:
+                return branches[0]
+            pattern = "(?:" + "|".join(branches) + ")"
+            return pattern + "?" if is_end else pattern
+
+        return to_pattern(trie)
+
+    def search(self, content_lower):
+        """Devuelve la primera palabra prohibida encontrada en el texto, o None."""
+        if self.pattern is None:
+            return None
+        match = self.pattern.search(content_lower)
+        return match.group(1) if match else None
+
+
+# --- Índice de enlaces permitidos ---
+URL_PATTERN = re.compile(r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+")
+
+class AllowedLinkIndex:
+    """
+    Trie de prefijos con los enlaces permitidos de un servidor.
+    Comprobar una URL cuesta lo mismo que recorrer sus caracteres, sin importar cuántos enlaces haya permitidos.
+    """
+    def __init__(self, allowed_links):
+        self.root = {}
+        for link in allowed_links:
+            link = link.lower().strip()
+            if not link:
+                continue
+            node = self.root
+            for char in link:
+                node = node.setdefault(char, {})
+            node[""] = True # Marca de fin de prefijo permitido
+
+    def is_allowed(self, url):
+        """Devuelve True si la URL empieza por alguno de los enlaces permitidos."""
+        node = self.root
+        for char in url.lower():
+            node = node.get(char)
+            if node is None:
+                return False
+            if "" in node:
+                return True
+        return False
+
+
+# --- Estado de detección de spam ---
+class SpamWindow:
+    """Ventana deslizante de un usuario: últimos timestamps y estado de repetición del último mensaje."""
+    __slots__ = ("timestamps", "last_content_hash", "repeat_count", "last_seen")
+
+    def __init__(self):
+        self.timestamps = deque(maxlen=SPAM_THRESHOLD_COUNT)
+        self.last_content_hash = None
+        self.repeat_count = 0
+        self.last_seen = 0.0
+
+    def register_message(self, now):
+        """Añade un mensaje a la ventana y devuelve cuántos hay dentro de SPAM_THRESHOLD_TIME."""
+        timestamps = self.timestamps
+        while timestamps and now - timestamps[0] >= SPAM_THRESHOLD_TIME:
+            timestamps.popleft()
+        timestamps.append(now)
+        return len(timestamps)
+
+    def register_content(self, clean_content):
+        """Actualiza el contador de mensajes idénticos consecutivos y lo devuelve."""
+        if not clean_content:
+            self.last_content_hash = None
+            self.repeat_count = 0
+            return 0
+        content_hash = hash(clean_content) # Se guarda solo el hash para no retener el texto
+        if content_hash == self.last_content_hash:
+            self.repeat_count += 1
+        else:
+            self.last_content_hash = content_hash
+            self.repeat_count = 1
+        return self.repeat_count
+
+
+class SpamTracker:
+    """
+    Guarda una SpamWindow por (servidor, usuario) en orden de uso.
+    Las entradas inactivas se expulsan desde el principio y hay un tope duro de entradas.
+    """
+    def __init__(self, idle_seconds=SPAM_IDLE_EVICTION_SECONDS, max_entries=SPAM_MAX_TRACKED_USERS):
+        self.idle_seconds = idle_seconds
+        self.max_entries = max_entries
+        self.windows = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.windows)
+
+    def get(self, guild_id, user_id, now):
+        key = (guild_id, user_id)
+        window = self.windows.get(key)
+        if window is None:
+            window = SpamWindow()
+            self.windows[key] = window
+        else:
+            self.windows.move_to_end(key)
+        window.last_seen = now
+        self._evict(now)
+        return window
+
+    def _evict(self, now):
+        windows = self.windows
+        # Las entradas más antiguas están al principio: solo se revisan mientras estén inactivas
+        while windows:
+            key, window = next(iter(windows.items()))
+            if now - window.last_seen < self.idle_seconds and len(windows) <= self.max_entries:
+                break
+            del windows[key]
+            self.evicted += 1
+
+    def memory_bytes(self):
+        """Estimación de la memoria ocupada por el estado de spam (en bytes)."""
+        total = sys.getsizeof(self.windows)
+        for key, window in self.windows.items():
+            total += sys.getsizeof(key) + sys.getsizeof(window) + sys.getsizeof(window.timestamps)
+        return total
+
+
+# --- Programador de fin de mutes ---
+class MuteScheduler:
+    """
+    Guarda los vencimientos de mute en Mongo (colección `mute_expiries`, indexada por `expires_at`)
+    y los programa en un DeadlineScheduler: una sola tarea duerme hasta el próximo vencimiento,
+    así que miles de mutes simultáneos cuestan una tarea, y los pendientes se recargan al reiniciar.
+    """
+    def __init__(self, cog):
+        self.cog = cog
+        self.bot = cog.bot
+        self.pending = {} # (guild_id, user_id) -> datos del mute vigente
+        self.deadlines = DeadlineScheduler(self.bot, self._expire, "mutes")
+
+    async def start(self):
+        if self.bot.db is not None:
+            try:
+                await self.bot.db.mute_expiries.create_index("expires_at")
+                async for doc in self.bot.db.mute_expiries.find({}):
+                    self._push(doc["guild_id"], doc["user_id"], doc.get("role_id"), doc.get("channel_id"), as_utc(doc["expires_at"]))
+                print(f"MuteScheduler: {len(self.pending)} mutes pendientes recargados desde la base de datos.")
+            except Exception as e:
+                print(f"ERROR al recargar los mutes pendientes: {e}")
+        self.deadlines.start()
+
+    def stop(self):
+        self.deadlines.stop()
+
+    def _push(self, guild_id, user_id, role_id, channel_id, expires_at):
+        self.pending[(guild_id, user_id)] = {"expires_at": expires_at, "role_id": role_id, "channel_id": channel_id}
+        self.deadlines.schedule((guild_id, user_id), expires_at) # Reemplaza el plazo de un mute anterior
+
+    async def schedule(self, guild_id, user_id, role_id, channel_id, duration_seconds):
+        expires_at = discord.utils.utcnow() + datetime.timedelta(seconds=duration_seconds)
+        if self.bot.db is not None:
+            await self.bot.db.mute_expiries.update_one(
+                {"_id": f"{guild_id}-{user_id}"},
+                {"$set": {
+                    "guild_id": guild_id,
+                    "user_id": user_id,
+                    "role_id": role_id,
+                    "channel_id": channel_id,
+                    "expires_at": expires_at
+                }},
+                upsert=True
+            )
+        self._push(guild_id, user_id, role_id, channel_id, expires_at)
+
+    async def _expire(self, key):
+        guild_id, user_id = key
+        entry = self.pending.get(key)
+        if entry is None or entry["expires_at"] > discord.utils.utcnow():
+            return # Un mute nuevo reemplazó a este mientras esperaba turno; su propio plazo se encargará
+        del self.pending[key]
+
+        try:
+            await self.cog.expire_mute(guild_id, user_id, entry["role_id"], entry["channel_id"])
+        except Exception as e:
+            print(f"ERROR al desmutear automáticamente a {user_id} en {guild_id}: {e}")
+
+        if self.bot.db is not None:
+            try:
+                await self.bot.db.mute_expiries.delete_one({"_id": f"{guild_id}-{user_id}", "expires_at": {"$lte": entry["expires_at"]}})
+            except Exception as e:
+                print(f"ERROR al eliminar el vencimiento de mute de {user_id}: {e}")
+
+
+# --- Aprovisionamiento del rol 'Muted' ---
+MUTED_ROLE_PERMISSION_CONCURRENCY = 5 # Ediciones de permisos simultáneas por servidor
+
+class MutedRoleProvisioner:
+    """
+    Crea el rol 'Muted' y configura sus permisos en todos los canales como un trabajo en segundo plano.
+    Cada canal tiene su propio bucket de rate limit en Discord (PUT /channels/{id}/permissions), así que
+    las ediciones se reparten en paralelo con concurrencia limitada para no rozar el límite global;
+    discord.py se encarga de esperar si algún bucket devuelve 429.
+    """
+    def __init__(self, cog):
+        self.cog = cog
+        self.locks = {} # guild_id -> asyncio.Lock para no crear el rol dos veces
+        self.jobs = {} # guild_id -> progreso del trabajo actual o del último
+
+    async def ensure_muted_role(self, guild, log_channel=None, notify_channel=None):
+        """Devuelve (rol, creado). Si el rol no existe lo crea y lanza la configuración de canales."""
+        lock = self.locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            mute_role = discord.utils.get(guild.roles, name="Muted")
+            if mute_role:
+                return mute_role, False
+            mute_role = await guild.create_role(
+                name="Muted",
+                permissions=discord.Permissions(
+                    send_messages=False,
+                    add_reactions=False,
+                    speak=False
+                ),
+                reason="Rol 'Muted' creado por el bot para moderación automática."
+            )
+            self.start_job(guild, mute_role, log_channel, notify_channel)
+            return mute_role, True
+
+    def start_job(self, guild, mute_role, log_channel=None, notify_channel=None):
+        job = self.jobs.get(guild.id)
+        if job and not job["task"].done():
+            return job
+        job = {"total": 0, "done": 0, "failed": 0, "started_at": time.time(), "finished_at": None, "task": None}
+        job["task"] = asyncio.create_task(self._apply_overwrites(guild, mute_role, job, log_channel, notify_channel))
+        self.jobs[guild.id] = job
+        return job
+
+    async def _apply_overwrites(self, guild, mute_role, job, log_channel, notify_channel):
+        # Primero las categorías y después sus canales. La API no propaga los permisos de una categoría
+        # a sus hijos, así que los canales sincronizados también reciben la misma sobrescritura
+        # y siguen sincronizados con su categoría.
+        categories = list(guild.categories)
+        channels = [c for c in guild.channels if isinstance(c, (discord.TextChannel, discord.VoiceChannel, discord.StageChannel, discord.ForumChannel))]
+        job["total"] = len(categories) + len(channels)
+        semaphore = asyncio.Semaphore(MUTED_ROLE_PERMISSION_CONCURRENCY)
+
+        async def apply(channel):
+            async with semaphore:
+                try:
+                    await channel.set_permissions(mute_role, send_messages=False, add_reactions=False, speak=False, reason="Configuración del rol 'Muted'.")
+                    job["done"] += 1
+                except Exception as e:
+                    job["failed"] += 1
+                    print(f"ERROR al configurar el rol 'Muted' en el canal {channel.name} ({channel.id}): {e}")
+
+        await asyncio.gather(*(apply(c) for c in categories))
+        await asyncio.gather(*(apply(c) for c in channels))
+        job["finished_at"] = time.time()
+
+        summary = f"Rol 'Muted' configurado en {job['done']}/{job['total']} canales ({job['failed']} fallidos) en {job['finished_at'] - job['started_at']:.1f}s."
+        print(f"{summary} Servidor: '{guild.name}'.")
+        targets = {c.id: c for c in (log_channel, notify_channel) if c}
+        for channel in targets.values():
+            try:
+                await channel.send(f"✅ {summary}")
+            except Exception as e:
+                print(f"ERROR al notificar la configuración del rol 'Muted': {e}")
+
+    def progress(self, guild_id):
+        return self.jobs.get(guild_id)
+
+
+# --- Envío agrupado de logs de moderación ---
+MOD_LOG_FLUSH_INTERVAL = 2.0 # Segundos máximos que un log espera antes de enviarse
+MOD_LOG_EMBEDS_PER_MESSAGE = 10 # Máximo de embeds que Discord admite por mensaje
+MOD_LOG_MAX_BATCH = 200 # Registros máximos que se procesan en una sola descarga
+MOD_LOG_QUEUE_SIZE = 1000 # Registros pendientes por canal antes de empezar a descartar
+
+class ModLogSink:
+    """
+    Cola de logs de un canal de moderación. Agrupa hasta 10 embeds por mensaje y los envía
+    cada MOD_LOG_FLUSH_INTERVAL segundos o en cuanto se llena un mensaje. Si en una descarga hay más
+    registros de los que caben, los eventos repetidos (mismo usuario, acción y razón) se resumen en uno.
+    La cola está acotada: si se llena, los logs nuevos se descartan y se cuentan, sin bloquear la moderación.
+    """
+    def __init__(self, channel):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=MOD_LOG_QUEUE_SIZE)
+        self.dropped = 0
+        self.task = asyncio.create_task(self._run())
+
+    def submit(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def stop(self):
+        self.task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + MOD_LOG_FLUSH_INTERVAL
+            while len(batch) < MOD_LOG_EMBEDS_PER_MESSAGE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Bajo carga, tomar también lo que ya está esperando para poder resumirlo
+            while len(batch) < MOD_LOG_MAX_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                print(f"ERROR al enviar log de moderación: {e}")
+
+    def _collapse(self, batch):
+        if len(batch) <= MOD_LOG_EMBEDS_PER_MESSAGE:
+            return [(record, 1) for record in batch]
+        groups = {}
+        for record in batch:
+            key = (record["offender_id"], record["action_type"], record["reason"])
+            if key in groups:
+                groups[key][1] += 1
+                groups[key][0] = record # Conservar el más reciente (enlace y hora)
+            else:
+                groups[key] = [record, 1]
+        return [(record, count) for record, count in groups.values()]
+
+    def _build_embed(self, record, count):
+        title = record["embed_title"]
+        description = record["description"]
+        if count > 1:
+            title = f"{title} (x{count})"
+            description = f"{record['offender_name']}: {record['action_type']} {count} veces. Razón: {record['reason']}"
+        log_embed = discord.Embed(
+            title=title,
+            description=description,
+            color=record["color"]
+        )
+        log_embed.add_field(name="Usuario", value=record["offender_mention"], inline=True)
+        log_embed.add_field(name="ID de Usuario", value=record["offender_id"], inline=True)
+        log_embed.add_field(name="Acción", value=record["action_type"], inline=True)
+        log_embed.add_field(name="Razón", value=record["reason"], inline=True)
+        log_embed.set_footer(text=f"En canal: #{self.channel.name}")
+        log_embed.timestamp = record["timestamp"]
+
+        if record["message_link"]:
+            log_embed.add_field(name="Mensaje", value=f"[Ir al Mensaje]({record['message_link']})", inline=False)
+        return log_embed
+
+    async def _flush(self, batch):
+        embeds = [self._build_embed(record, count) for record, count in self._collapse(batch)]
+        dropped, self.dropped = self.dropped, 0
+        for i in range(0, len(embeds), MOD_LOG_EMBEDS_PER_MESSAGE):
+            content = None
+            if dropped and i == 0:
+                content = f"⚠️ Se descartaron {dropped} logs de moderación por exceso de carga."
+            try:
+                await self.channel.send(content=content, embeds=embeds[i:i + MOD_LOG_EMBEDS_PER_MESSAGE])
+            except discord.Forbidden:
+                print(f"ERROR: El bot no tiene permisos para enviar logs en el canal {self.channel.name} ({self.channel.id}).")
+                return
+
+
+# --- Detección de raids entre usuarios ---
+# Menciones, dígitos, signos y espacios se eliminan para que variaciones triviales den la misma huella
+RAID_NORMALIZE_PATTERN = re.compile(r"<[@#][!&]?\d+>|[\W\d_]+")
+# Enlaces y menciones: la carga típica de un raid. Sin ellos se exige un texto bastante más largo.
+RAID_PAYLOAD_PATTERN = re.compile(r"https?://|discord(?:\.gg|app\.com/invite|\.com/invite)/|<@[!&]?\d+>|@everyone|@here", re.IGNORECASE)
+
+def content_fingerprint(content):
+    """Huella del contenido normalizado de un mensaje, o None si no da señal suficiente para compararlo."""
+    normalized = RAID_NORMALIZE_PATTERN.sub("", content.lower())
+    if len(normalized) < RAID_MIN_CONTENT_LENGTH:
+        return None
+    if len(normalized) < RAID_MIN_PLAIN_CONTENT_LENGTH and not RAID_PAYLOAD_PATTERN.search(content):
+        return None
+    return hash(normalized)
+
+
+class GuildRaidIndex:
+    """
+    Índice deslizante de huellas de contenido de un servidor. Para cada huella cuenta qué usuarios
+    la enviaron dentro de RAID_WINDOW_SECONDS; cada mensaje cuesta O(1) amortizado y la memoria
+    está acotada por RAID_MAX_ENTRIES_PER_GUILD.
+    """
+    def __init__(self):
+        self.entries = deque() # (timestamp, huella, user_id) en orden de llegada
+        self.users_by_fingerprint = {} # huella -> {user_id: mensajes en la ventana}
+        self.raid_until = 0.0
+        self.raid_fingerprints = set()
+        self.blocked = 0
+
+    def _forget_oldest(self):
+        _, fingerprint, user_id = self.entries.popleft()
+        users = self.users_by_fingerprint[fingerprint]
+        users[user_id] -= 1
+        if not users[user_id]:
+            del users[user_id]
+            if not users:
+                del self.users_by_fingerprint[fingerprint]
+
+    def record(self, fingerprint, user_id, now):
+        """Registra un mensaje. Devuelve True si este mensaje activa el modo raid."""
+        while self.entries and (now - self.entries[0][0] > RAID_WINDOW_SECONDS or len(self.entries) >= RAID_MAX_ENTRIES_PER_GUILD):
+            self._forget_oldest()
+        self.entries.append((now, fingerprint, user_id))
+        users = self.users_by_fingerprint.setdefault(fingerprint, {})
+        users[user_id] = users.get(user_id, 0) + 1
+
+        if len(users) < RAID_DISTINCT_USERS:
+            return False
+        started = not self.in_raid(now)
+        if started:
+            self.blocked = 0
+        self.raid_fingerprints.add(fingerprint)
+        self.raid_until = now + RAID_MODE_DURATION
+        return started
+
+    def in_raid(self, now):
+        if now < self.raid_until:
+            return True
+        if self.raid_fingerprints:
+            self.raid_fingerprints.clear()
+        return False
+
+    def should_reject(self, fingerprint, now):
+        """Camino rápido: True si el servidor está en modo raid y el mensaje es contenido del raid."""
+        if fingerprint not in self.raid_fingerprints or not self.in_raid(now):
+            return False
+        self.blocked += 1
+        self.raid_until = now + RAID_MODE_DURATION # El raid sigue activo mientras llegue contenido
+        return True
+
+
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Versión de la configuración de moderación por servidor; update_moderation_settings la incrementa.
+        self.settings_versions = {}
+        # Buscadores compilados por servidor: guild_id -> (versión de la configuración, buscador).
+        self.word_matchers = {}
+        # Índices de enlaces permitidos por servidor: guild_id -> (versión de la configuración, índice).
+        self.link_indexes = {}
+        # Ventanas de spam por usuario, con expulsión de inactivos y tope de memoria.
+        self.spam_tracker = SpamTracker()
+        # Único temporizador para todos los desmuteos pendientes.
+        self.mute_scheduler = MuteScheduler(self)
+        # Creación del rol 'Muted' y configuración de permisos en segundo plano.
+        self.role_provisioner = MutedRoleProvisioner(self)
+        # Un sink de logs por canal de logs (se crean al enviar el primer log).
+        self.log_sinks = {}
+        # Índices de huellas de contenido por servidor para detectar raids.
+        self.raid_indexes = {}
+
+    async def cog_load(self):
+        await self.mute_scheduler.start()
+
+    async def cog_unload(self):
+        self.mute_scheduler.stop()
+        for sink in self.log_sinks.values():
+            sink.stop()
 
     # --- Funciones Auxiliares (sin cambios) ---
     async def get_moderation_settings(self, guild_id):
@@ -33,46 +537,72 @@ class Moderation(commands.Cog):
             "log_channel_id": None
         }
 
-    async def send_mod_log(self, log_channel, embed_title, description, offender, action_type, reason, color, message_link=None):
-        if log_channel:
-            log_embed = discord.Embed(
-                title=embed_title,
-                description=description,
-                color=color
-            )
-            log_embed.add_field(name="Usuario", value=offender.mention, inline=True)
-            log_embed.add_field(name="ID de Usuario", value=offender.id, inline=True)
-            log_embed.add_field(name="Acción", value=action_type, inline=True)
-            log_embed.add_field(name="Razón", value=reason, inline=True)
-            log_embed.set_footer(text=f"En canal: #{log_channel.name}")
-            log_embed.timestamp = discord.utils.utcnow()
+    async def update_moderation_settings(self, guild_id, update, upsert=False):
+        """Escribe la configuración de moderación del servidor e invalida los buscadores e índices cacheados."""
+        result = await self.bot.db.moderation_settings.update_one({"_id": guild_id}, update, upsert=upsert)
+        self.settings_versions[guild_id] = self.settings_versions.get(guild_id, 0) + 1
+        return result
 
-            if message_link:
-                log_embed.add_field(name="Mensaje", value=f"[Ir al Mensaje]({message_link})", inline=False)
+    def get_word_matcher(self, guild_id, prohibited_words, version):
+        """
+        Devuelve el buscador compilado del servidor para la versión de configuración `version`
+        (leída antes de consultar la configuración), reconstruyéndolo solo si el cacheado es más antiguo.
+        Así un mensaje que leyó la lista antes de un addword/removeword no deja en caché la lista vieja.
+        """
+        cached = self.word_matchers.get(guild_id)
+        if cached is None or cached[0] < version:
+            cached = (version, ProhibitedWordMatcher(prohibited_words))
+            self.word_matchers[guild_id] = cached
+        return cached[1]
+
+    def get_link_index(self, guild_id, allowed_links, version):
+        """Devuelve el índice de enlaces permitidos del servidor; se invalida igual que get_word_matcher."""
+        cached = self.link_indexes.get(guild_id)
+        if cached is None or cached[0] < version:
+            cached = (version, AllowedLinkIndex(allowed_links))
+            self.link_indexes[guild_id] = cached
+        return cached[1]
+
+    def get_log_sink(self, log_channel):
+        sink = self.log_sinks.get(log_channel.id)
+        if sink is None:
+            sink = ModLogSink(log_channel)
+            self.log_sinks[log_channel.id] = sink
+        return sink
 
-            try:
-                await log_channel.send(embed=log_embed)
-            except discord.Forbidden:
-                print(f"ERROR: El bot no tiene permisos para enviar logs en el canal {log_channel.name} ({log_channel.id}).")
-            except Exception as e:
-                print(f"ERROR al enviar log de moderación: {e}")
+    async def send_mod_log(self, log_channel, embed_title, description, offender, action_type, reason, color, message_link=None):
+        if log_channel:
+            # No se envía aquí: el registro se encola y el sink del canal lo agrupa con otros
+            self.get_log_sink(log_channel).submit({
+                "embed_title": embed_title,
+                "description": description,
+                "offender_mention": offender.mention,
+                "offender_id": offender.id,
+                "offender_name": offender.name,
+                "action_type": action_type,
+                "reason": reason,
+                "color": color,
+                "message_link": message_link,
+                "timestamp": discord.utils.utcnow()
+            })
         else:
             print(f"MOD_LOG: {action_type} - {offender.name} | Razón: {reason}")
 
-    async def warn_or_mute_user(self, member, reason, message_to_delete=None):
+    async def warn_or_mute_user(self, member, reason, message_to_delete=None, mod_settings=None):
         user_id = member.id
         guild_id = member.guild.id
 
-        user_data = await self.bot.db.user_moderation_data.find_one({"_id": f"{guild_id}-{user_id}"})
-        current_warnings = user_data.get("warnings", 0) if user_data else 0
-
-        current_warnings += 1
-
-        await self.bot.db.user_moderation_data.update_one(
+        # Un único $inc atómico: `warnings` es el total acumulado y se mutea cada MAX_WARNINGS_BEFORE_MUTE
+        # advertencias. Solo la infracción que alcanza el múltiplo exacto mutea, así que ofensas
+        # simultáneas nunca mutean dos veces ni pierden advertencias, y no hace falta reiniciar el contador.
+        user_data = await self.bot.db.user_moderation_data.find_one_and_update(
             {"_id": f"{guild_id}-{user_id}"},
-            {"$set": {"warnings": current_warnings, "last_warn_timestamp": discord.utils.utcnow()}},
-            upsert=True
+            {"$inc": {"warnings": 1}, "$set": {"last_warn_timestamp": discord.utils.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
         )
+        total_warnings = user_data.get("warnings", 1)
+        current_warnings = (total_warnings - 1) % MAX_WARNINGS_BEFORE_MUTE + 1
 
         if message_to_delete:
             try:
@@ -82,7 +612,8 @@ class Moderation(commands.Cog):
             except Exception as e:
                 print(f"ERROR al eliminar mensaje: {e}")
 
-        mod_settings = await self.get_moderation_settings(guild_id)
+        if mod_settings is None:
+            mod_settings = await self.get_moderation_settings(guild_id)
         log_channel_id = mod_settings.get("log_channel_id")
         log_channel = self.bot.get_channel(log_channel_id) if log_channel_id else None
 
@@ -91,21 +622,14 @@ class Moderation(commands.Cog):
 
             if not mute_role:
                 try:
-                    mute_role = await member.guild.create_role(
-                        name="Muted",
-                        permissions=discord.Permissions(
-                            send_messages=False,
-                            add_reactions=False,
-                            speak=False
-                        ),
-                        reason="Rol 'Muted' creado por el bot para moderación automática."
+                    # Se crea el rol y los permisos de los canales se configuran en segundo plano
+                    mute_role, created = await self.role_provisioner.ensure_muted_role(
+                        member.guild,
+                        log_channel,
+                        message_to_delete.channel if message_to_delete else None
                     )
-                    for channel in member.guild.channels:
-                        if isinstance(channel, (discord.TextChannel, discord.VoiceChannel)):
-                            await channel.set_permissions(mute_role, send_messages=False, add_reactions=False, speak=False)
-                    print(f"Rol 'Muted' creado y permisos configurados en el servidor '{member.guild.name}'.")
-                    if message_to_delete and message_to_delete.channel:
-                        await message_to_delete.channel.send(f"🚨 ¡Se ha creado y configurado el rol 'Muted' en este servidor!.")
+                    if created and message_to_delete and message_to_delete.channel:
+                        await message_to_delete.channel.send(f"🚨 ¡Se ha creado el rol 'Muted' en este servidor! Sus permisos se están configurando en los canales en segundo plano.")
                 except discord.Forbidden:
                     if message_to_delete and message_to_delete.channel:
                         await message_to_delete.channel.send(f"❌ No tengo permisos para crear el rol 'Muted'. Por favor, crea un rol 'Muted' manualmente con permisos de `No enviar mensajes` en los canales, y luego asigna al bot un rol con `Gestionar Roles` por encima del rol 'Muted'.")
@@ -118,19 +642,15 @@ class Moderation(commands.Cog):
                     await message_to_delete.channel.send(f"🔇 {member.mention} ha sido muteado por {MUTE_DURATION_SECONDS // 60} minutos por acumular {MAX_WARNINGS_BEFORE_MUTE} advertencias. Razón: {reason}")
                 await self.send_mod_log(log_channel, "🔇 Usuario Muteado Automáticamente", f"{member.name} ha sido muteado por acumular {MAX_WARNINGS_BEFORE_MUTE} advertencias.", member, "Mute Automático", reason, discord.Color.greyple(), message_to_delete.jump_url if message_to_delete else None)
 
-                await self.bot.db.user_moderation_data.update_one(
-                    {"_id": f"{guild_id}-{user_id}"},
-                    {"$set": {"warnings": 0}}
-                )
-
                 if MUTE_DURATION_SECONDS > 0:
-                    await asyncio.sleep(MUTE_DURATION_SECONDS)
-                    member_after_sleep = member.guild.get_member(member.id)
-                    if member_after_sleep and mute_role in member_after_sleep.roles:
-                        await member_after_sleep.remove_roles(mute_role, reason="Fin de mute automático.")
-                        if message_to_delete and message_to_delete.channel:
-                            await message_to_delete.channel.send(f"✅ {member.mention} ha sido desmuteado automáticamente.")
-                        await self.send_mod_log(log_channel, "✅ Usuario Desmuteado Automáticamente", f"{member.name} ha sido desmuteado.", member, "Desmute Automático", "Fin de la duración del mute.", discord.Color.green())
+                    # El desmuteo queda programado en Mongo; el manejador del mensaje no espera
+                    await self.mute_scheduler.schedule(
+                        guild_id,
+                        user_id,
+                        mute_role.id,
+                        message_to_delete.channel.id if message_to_delete and message_to_delete.channel else None,
+                        MUTE_DURATION_SECONDS
+                    )
 
             except discord.Forbidden:
                 if message_to_delete and message_to_delete.channel:
@@ -146,6 +666,49 @@ class Moderation(commands.Cog):
             await self.send_mod_log(log_channel, "⚠️ Usuario Advertido", f"{member.name} ha recibido una advertencia.", member, "Advertencia", reason, discord.Color.gold(), message_to_delete.jump_url if message_to_delete else None)
 
 
+    async def expire_mute(self, guild_id, user_id, role_id, channel_id):
+        """Quita el rol 'Muted' cuando vence un mute programado por MuteScheduler."""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        member = guild.get_member(user_id)
+        mute_role = guild.get_role(role_id) if role_id else discord.utils.get(guild.roles, name="Muted")
+        if not member or not mute_role or mute_role not in member.roles:
+            return
+
+        await member.remove_roles(mute_role, reason="Fin de mute automático.")
+        channel = guild.get_channel(channel_id) if channel_id else None
+        if channel:
+            await channel.send(f"✅ {member.mention} ha sido desmuteado automáticamente.")
+
+        mod_settings = await self.get_moderation_settings(guild_id)
+        log_channel_id = mod_settings.get("log_channel_id")
+        log_channel = self.bot.get_channel(log_channel_id) if log_channel_id else None
+        await self.send_mod_log(log_channel, "✅ Usuario Desmuteado Automáticamente", f"{member.name} ha sido desmuteado.", member, "Desmute Automático", "Fin de la duración del mute.", discord.Color.green())
+
+
+    async def announce_raid_mode(self, message):
+        """Avisa en el canal de logs de que el servidor ha entrado en modo raid."""
+        guild = message.guild
+        print(f"MODO RAID activado en el servidor '{guild.name}' ({guild.id}).")
+        mod_settings = await self.get_moderation_settings(guild.id)
+        log_channel_id = mod_settings.get("log_channel_id")
+        log_channel = self.bot.get_channel(log_channel_id) if log_channel_id else None
+        if not log_channel:
+            return
+        raid_embed = discord.Embed(
+            title="🚨 Modo Raid Activado",
+            description=f"Al menos {RAID_DISTINCT_USERS} usuarios distintos han enviado el mismo contenido en {RAID_WINDOW_SECONDS} segundos. Los mensajes con ese contenido se eliminarán automáticamente durante {RAID_MODE_DURATION // 60} minutos desde el último intento.",
+            color=discord.Color.dark_red()
+        )
+        raid_embed.add_field(name="Canal", value=message.channel.mention, inline=True)
+        raid_embed.add_field(name="Ejemplo", value=message.content[:1000] or "(vacío)", inline=False)
+        raid_embed.timestamp = discord.utils.utcnow()
+        try:
+            await log_channel.send(embed=raid_embed)
+        except Exception as e:
+            print(f"ERROR al enviar aviso de modo raid: {e}")
+
     # --- Evento on_message para Detección de Moderación (sin cambios) ---
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -161,6 +724,28 @@ class Moderation(commands.Cog):
             return
 
         guild_id = message.guild.id
+
+        # Detección de raids antes de cualquier consulta a la base de datos. El staff queda exento.
+        is_staff = isinstance(message.author, discord.Member) and message.author.guild_permissions.manage_messages
+        fingerprint = None if is_staff else content_fingerprint(message.content)
+        if fingerprint is not None:
+            now = time.time()
+            raid_index = self.raid_indexes.get(guild_id)
+            if raid_index is None:
+                raid_index = self.raid_indexes[guild_id] = GuildRaidIndex()
+            if raid_index.record(fingerprint, message.author.id, now):
+                await self.announce_raid_mode(message)
+            if raid_index.should_reject(fingerprint, now):
+                try:
+                    await message.delete()
+                except discord.HTTPException as e:
+                    print(f"ERROR al eliminar mensaje de raid en {message.channel.name}: {e}")
+                # El contenido se elimina, pero un comando en el mensaje se sigue procesando
+                await self.bot.process_commands(message)
+                return
+
+        # La versión se lee antes de la consulta: si la configuración cambia mientras tanto, la caché lo detecta
+        settings_version = self.settings_versions.get(guild_id, 0)
         mod_settings = await self.get_moderation_settings(guild_id)
         prohibited_words = mod_settings.get("prohibited_words", [])
         allowed_links = mod_settings.get("allowed_links", [])
@@ -169,61 +754,35 @@ class Moderation(commands.Cog):
         log_channel = self.bot.get_channel(log_channel_id) if log_channel_id else None
 
         content_lower = message.content.lower()
-        for word in prohibited_words:
-            if re.search(r'\b' + re.escape(word) + r'\b', content_lower):
-                await self.warn_or_mute_user(message.author, f"Uso de palabra prohibida: '{word}'", message)
-                return
+        word = self.get_word_matcher(guild_id, prohibited_words, settings_version).search(content_lower)
+        if word:
+            await self.warn_or_mute_user(message.author, f"Uso de palabra prohibida: '{word}'", message, mod_settings)
+            return
 
-        url_pattern = r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
-        found_urls = re.findall(url_pattern, message.content)
+        found_urls = URL_PATTERN.findall(message.content)
 
         if found_urls:
-            is_allowed = False
-            for url in found_urls:
-                if any(url.lower().startswith(allowed_link.lower()) for allowed_link in allowed_links):
-                    is_allowed = True
-                    break
-            
+            link_index = self.get_link_index(guild_id, allowed_links, settings_version)
+            is_allowed = any(link_index.is_allowed(url) for url in found_urls)
+
             if not is_allowed:
-                await self.warn_or_mute_user(message.author, f"Envío de enlace no permitido: '{found_urls[0]}'", message)
+                await self.warn_or_mute_user(message.author, f"Envío de enlace no permitido: '{found_urls[0]}'", message, mod_settings)
                 return
 
         current_time = time.time()
-        user_id = message.author.id
+        window = self.spam_tracker.get(guild_id, message.author.id, current_time)
 
-        if guild_id not in spam_detection:
-            spam_detection[guild_id] = {}
-        if user_id not in spam_detection[guild_id]:
-            spam_detection[guild_id][user_id] = []
-        
-        spam_detection[guild_id][user_id] = [
-            t for t in spam_detection[guild_id][user_id] if current_time - t < SPAM_THRESHOLD_TIME
-        ]
-        spam_detection[guild_id][user_id].append(current_time)
-
-        if len(spam_detection[guild_id][user_id]) >= SPAM_THRESHOLD_COUNT:
-            await self.warn_or_mute_user(message.author, f"Spam detectado (demasiados mensajes en {SPAM_THRESHOLD_TIME} segundos).", message)
-            spam_detection[guild_id][user_id].clear()
+        if window.register_message(current_time) >= SPAM_THRESHOLD_COUNT:
+            window.timestamps.clear()
+            await self.warn_or_mute_user(message.author, f"Spam detectado (demasiados mensajes en {SPAM_THRESHOLD_TIME} segundos).", message, mod_settings)
             return
 
         clean_content = message.content.lower().strip()
 
-        if guild_id not in recent_messages:
-            recent_messages[guild_id] = {}
-        if user_id not in recent_messages[guild_id]:
-            recent_messages[guild_id][user_id] = {"last_message_content": "", "last_message_count": 0}
-
-        last_msg_data = recent_messages[guild_id][user_id]
-
-        if clean_content == last_msg_data["last_message_content"] and clean_content:
-            last_msg_data["last_message_count"] += 1
-            if last_msg_data["last_message_count"] >= SPAM_REPETITION_THRESHOLD:
-                await self.warn_or_mute_user(message.author, f"Spam detectado (mensaje idéntico repetido {SPAM_REPETITION_THRESHOLD} veces).", message)
-                last_msg_data["last_message_count"] = 0
-                return
-        else:
-            last_msg_data["last_message_content"] = clean_content
-            last_msg_data["last_message_count"] = 1
+        if window.register_content(clean_content) >= SPAM_REPETITION_THRESHOLD:
+            window.repeat_count = 0
+            await self.warn_or_mute_user(message.author, f"Spam detectado (mensaje idéntico repetido {SPAM_REPETITION_THRESHOLD} veces).", message, mod_settings)
+            return
 
         await self.bot.process_commands(message)
 
@@ -240,8 +799,8 @@ class Moderation(commands.Cog):
         if self.bot.db is None: return await ctx.send("❌ Error: La base de datos no está conectada.")
         guild_id = ctx.guild.id
         try:
-            await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            await self.update_moderation_settings(
+                guild_id,
                 {"$set": {"log_channel_id": channel.id}},
                 upsert=True
             )
@@ -264,8 +823,8 @@ class Moderation(commands.Cog):
             return await ctx.send("❌ Por favor, especifica una palabra o frase para añadir.")
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$addToSet": {"prohibited_words": word}},
                 upsert=True
             )
@@ -292,8 +851,8 @@ class Moderation(commands.Cog):
             return await ctx.send("❌ Por favor, especifica una palabra o frase para eliminar.")
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$pull": {"prohibited_words": word}}
             )
             if result.modified_count > 0:
@@ -343,8 +902,8 @@ class Moderation(commands.Cog):
             return await ctx.send("❌ Por favor, especifica un enlace o patrón de dominio a añadir (ej. `youtube.com/`, `discord.gg/`).")
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$addToSet": {"allowed_links": link}},
                 upsert=True
             )
@@ -370,8 +929,8 @@ class Moderation(commands.Cog):
             return await ctx.send("❌ Por favor, especifica un enlace o patrón de dominio a eliminar.")
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$pull": {"allowed_links": link}}
             )
             if result.modified_count > 0:
@@ -406,6 +965,21 @@ class Moderation(commands.Cog):
             await ctx.send("ℹ️ No hay enlaces permitidos configurados para este servidor. ¡Usa `!addlink <dominio.com/>` para añadir uno!")
 
 
+    @commands.command(name='mutedstatus')
+    @commands.has_permissions(manage_roles=True)
+    async def muted_role_status(self, ctx):
+        """
+        Muestra el progreso de la configuración del rol 'Muted' en los canales del servidor.
+        Uso: !mutedstatus
+        """
+        job = self.role_provisioner.progress(ctx.guild.id)
+        if not job:
+            return await ctx.send("ℹ️ No hay ninguna configuración del rol 'Muted' en curso ni registrada desde el último reinicio.")
+
+        state = "en curso" if job["finished_at"] is None else "terminada"
+        elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+        await ctx.send(f"🔧 Configuración del rol 'Muted' {state}: {job['done']}/{job['total']} canales configurados, {job['failed']} fallidos ({elapsed:.1f}s).")
+
     # --- NUEVOS COMANDOS DE BARRA (SLASH COMMANDS) ---
     # ¡Correcciones implementadas aquí con defer() y followup.send()!
 
@@ -420,8 +994,8 @@ class Moderation(commands.Cog):
 
         guild_id = interaction.guild_id
         try:
-            await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            await self.update_moderation_settings(
+                guild_id,
                 {"$set": {"log_channel_id": channel.id}},
                 upsert=True
             )
@@ -447,8 +1021,8 @@ class Moderation(commands.Cog):
             return await interaction.followup.send("❌ Por favor, especifica una palabra o frase para añadir.", ephemeral=True)
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$addToSet": {"prohibited_words": word}},
                 upsert=True
             )
@@ -475,8 +1049,8 @@ class Moderation(commands.Cog):
             return await interaction.followup.send("❌ Por favor, especifica una palabra o frase para eliminar.", ephemeral=True)
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$pull": {"prohibited_words": word}}
             )
             if result.modified_count > 0:
@@ -526,8 +1100,8 @@ class Moderation(commands.Cog):
             return await interaction.followup.send("❌ Por favor, especifica un enlace o patrón de dominio a añadir (ej. `youtube.com/`, `discord.gg/`).", ephemeral=True)
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$addToSet": {"allowed_links": link}},
                 upsert=True
             )
@@ -554,8 +1128,8 @@ class Moderation(commands.Cog):
             return await interaction.followup.send("❌ Por favor, especifica un enlace o patrón de dominio a eliminar.", ephemeral=True)
 
         try:
-            result = await self.bot.db.moderation_settings.update_one(
-                {"_id": guild_id},
+            result = await self.update_moderation_settings(
+                guild_id,
                 {"$pull": {"allowed_links": link}}
             )
             if result.modified_count > 0:
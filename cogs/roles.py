@@ -1,12 +1,321 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
+import time
+import uuid
+import datetime
+import bisect
+import difflib
+import itertools
+from utils.scheduling import as_utc
+
+# --- Trabajos de roles masivos ---
+BULK_ROLE_CONCURRENCY = 3 # Ediciones de miembros en paralelo (comparten el bucket de rate limit del servidor)
+BULK_ROLE_CHUNK_SIZE = 50 # Miembros por lote; el progreso se guarda al terminar cada lote
+
+
+class BulkRoleJob:
+    """
+    Añade o quita un rol a todos los miembros que cumplen un filtro, en segundo plano.
+    Los miembros se recorren en orden de ID y, tras cada lote, el último ID procesado y los contadores
+    se guardan en `bulk_role_jobs`, así que tras un reinicio el trabajo continúa donde se quedó.
+    """
+    def __init__(self, bot, doc):
+        self.bot = bot
+        self.doc = doc
+        self.task = None
+        self.semaphore = asyncio.Semaphore(BULK_ROLE_CONCURRENCY)
+        self.session_started = time.monotonic()
+        self.session_processed = 0
+
+    @staticmethod
+    def matches(member, filters):
+        if member.bot:
+            return False
+        has_role_id = filters.get("has_role_id")
+        if has_role_id and not member.get_role(has_role_id):
+            return False
+        joined_after = filters.get("joined_after")
+        if joined_after:
+            if member.joined_at is None:
+                return False
+            if member.joined_at <= as_utc(joined_after):
+                return False
+        return True
+
+    def pending_members(self, guild):
+        last_member_id = self.doc.get("last_member_id") or 0
+        return sorted(
+            (member for member in guild.members if member.id > last_member_id and self.matches(member, self.doc["filters"])),
+            key=lambda member: member.id
+        )
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def save(self, **fields):
+        self.doc.update(fields)
+        fields["updated_at"] = discord.utils.utcnow()
+        await self.bot.db.bulk_role_jobs.update_one({"_id": self.doc["_id"]}, {"$set": fields})
+
+    async def run(self):
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(self.doc["guild_id"])
+        role = guild.get_role(self.doc["role_id"]) if guild else None
+        if role is None:
+            await self.save(status="failed", error="El servidor o el rol ya no existen.")
+            return
+
+        members = self.pending_members(guild)
+        print(f"BulkRole {self.doc['_id']}: {self.doc['action']} '{role.name}' para {len(members)} miembros pendientes en '{guild.name}'.")
+        try:
+            for start in range(0, len(members), BULK_ROLE_CHUNK_SIZE):
+                # Si el rol se eliminó a mitad del trabajo, cada edición fallaría con NotFound (y contaría como "skipped")
+                role = guild.get_role(self.doc["role_id"])
+                if role is None:
+                    await self.save(status="failed", error="El rol se eliminó durante el trabajo.")
+                    print(f"BulkRole {self.doc['_id']} detenido: el rol ya no existe.")
+                    return
+                chunk = members[start:start + BULK_ROLE_CHUNK_SIZE]
+                results = await asyncio.gather(*(self.apply(member, role) for member in chunk))
+                self.session_processed += len(chunk)
+                await self.save(
+                    last_member_id=chunk[-1].id,
+                    processed=self.doc["processed"] + len(chunk),
+                    changed=self.doc["changed"] + results.count("changed"),
+                    skipped=self.doc["skipped"] + results.count("skipped"),
+                    failed=self.doc["failed"] + results.count("failed")
+                )
+            await self.save(status="completed", finished_at=discord.utils.utcnow())
+            print(f"BulkRole {self.doc['_id']} completado: {self.doc['changed']} cambios, {self.doc['failed']} errores.")
+        except asyncio.CancelledError:
+            raise # Se reanuda desde last_member_id en el siguiente arranque (o se canceló a propósito)
+        except discord.Forbidden:
+            await self.save(status="failed", error="Sin permisos para gestionar el rol.")
+        except Exception as e:
+            print(f"ERROR en el trabajo de roles masivo {self.doc['_id']}: {e}")
+            await self.save(status="failed", error=str(e))
+
+    async def apply(self, member, role):
+        has_role = member.get_role(role.id) is not None
+        if (self.doc["action"] == "add") == has_role:
+            return "skipped"
+        reason = f"Rol masivo ({self.doc['action']}) solicitado por {self.doc['requested_by']}"
+        async with self.semaphore:
+            try:
+                if self.doc["action"] == "add":
+                    await member.add_roles(role, reason=reason)
+                else:
+                    await member.remove_roles(role, reason=reason)
+                return "changed"
+            except discord.NotFound:
+                return "skipped" # El miembro salió del servidor
+            except discord.Forbidden:
+                raise
+            except discord.HTTPException as e:
+                print(f"ERROR al cambiar el rol de {member} ({member.id}): {e}")
+                return "failed"
+
+    def throughput(self):
+        """Miembros por segundo en esta sesión (desde el arranque o la reanudación)."""
+        elapsed = time.monotonic() - self.session_started
+        return self.session_processed / elapsed if elapsed > 0 else 0.0
+
+
+# --- Índice de nombres de roles ---
+ROLE_SUGGESTION_LIMIT = 25 # Máximo de opciones de autocompletado que admite Discord
+
+
+class RoleNameIndex:
+    """
+    Índice de los roles de un servidor por nombre sin distinguir mayúsculas (casefold).
+    `by_name` da la búsqueda exacta en O(1) y `names` (lista ordenada) permite buscar por prefijo
+    con bisect; las sugerencias aproximadas usan difflib sobre un subconjunto de los nombres.
+    Se mantiene con los eventos on_guild_role_create/update/delete.
+    """
+    __slots__ = ("by_name", "names", "display_names")
+
+    def __init__(self, roles):
+        self.by_name = {} # nombre casefold -> [IDs de roles]
+        self.names = [] # nombres casefold únicos, ordenados
+        self.display_names = {} # role_id -> nombre original
+        for role in roles:
+            if not role.is_default():
+                self.add(role)
+
+    def add(self, role):
+        key = role.name.casefold()
+        self.display_names[role.id] = role.name
+        role_ids = self.by_name.get(key)
+        if role_ids is None:
+            self.by_name[key] = [role.id]
+            bisect.insort(self.names, key)
+        elif role.id not in role_ids:
+            role_ids.append(role.id)
+
+    def remove(self, role_id, name):
+        key = name.casefold()
+        self.display_names.pop(role_id, None)
+        role_ids = self.by_name.get(key)
+        if not role_ids or role_id not in role_ids:
+            return
+        role_ids.remove(role_id)
+        if not role_ids:
+            del self.by_name[key]
+            index = bisect.bisect_left(self.names, key)
+            if index < len(self.names) and self.names[index] == key:
+                del self.names[index]
+
+    def lookup(self, name):
+        """IDs de los roles cuyo nombre coincide sin distinguir mayúsculas."""
+        return self.by_name.get(name.casefold(), [])
+
+    def prefix_matches(self, query, limit=ROLE_SUGGESTION_LIMIT):
+        key = query.casefold()
+        start = bisect.bisect_left(self.names, key)
+        matches = []
+        for name in itertools.islice(self.names, start, None): # Sin copiar la cola de la lista
+            if not name.startswith(key) or len(matches) >= limit:
+                break
+            matches.extend(self.by_name[name])
+        return matches[:limit]
+
+    def suggest(self, query, limit=ROLE_SUGGESTION_LIMIT):
+        """
+        Roles por prefijo; si ninguno empieza así, por parecido del nombre (errores tipográficos).
+        La búsqueda aproximada solo compara los nombres con la misma inicial,
+        para que el autocompletado siga siendo rápido en servidores con cientos de roles.
+        """
+        if not query:
+            return [role_id for name in self.names[:limit] for role_id in self.by_name[name]][:limit]
+        suggestions = self.prefix_matches(query, limit)
+        if suggestions:
+            return suggestions
+
+        key = query.casefold()
+        start = bisect.bisect_left(self.names, key[0])
+        end = bisect.bisect_left(self.names, chr(ord(key[0]) + 1))
+        # Se compara con el inicio de cada nombre (un carácter más, por si falta una letra),
+        # así funciona tanto con nombres completos como con lo que se lleva escrito
+        candidates = {}
+        for name in self.names[start:end]:
+            candidates.setdefault(name[:len(key) + 1], []).append(name)
+        for prefix in difflib.get_close_matches(key, candidates, n=limit, cutoff=0.7):
+            for name in candidates[prefix]:
+                suggestions.extend(self.by_name[name])
+        return suggestions[:limit]
+
 
 class Roles(commands.Cog):
+    bulkrole = app_commands.Group(
+        name="bulkrole",
+        description="Añade o quita un rol a muchos miembros a la vez.",
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_roles=True)
+    )
+
     def __init__(self, bot):
         self.bot = bot
+        self.bulk_jobs = {} # guild_id -> BulkRoleJob activo
+        self.role_indexes = {} # guild_id -> RoleNameIndex (se construye al primer uso)
+
+    async def cog_load(self):
+        # Reanudar los trabajos que estaban en curso antes del reinicio
+        if self.bot.db is None:
+            return
+        try:
+            await self.bot.db.bulk_role_jobs.create_index([("guild_id", 1), ("status", 1)])
+            async for doc in self.bot.db.bulk_role_jobs.find({"status": "running"}):
+                job = BulkRoleJob(self.bot, doc)
+                self.bulk_jobs[doc["guild_id"]] = job
+                job.start()
+                print(f"BulkRole {doc['_id']} reanudado desde el miembro {doc.get('last_member_id')}.")
+        except Exception as e:
+            # Los comandos de roles deben seguir disponibles aunque no se puedan reanudar los trabajos
+            print(f"ERROR al reanudar los trabajos de roles masivos: {e}")
 
-    # --- Comandos de Prefijo para Roles (sin cambios) ---
+    async def cog_unload(self):
+        for job in self.bulk_jobs.values():
+            if job.task:
+                job.task.cancel()
+
+    # --- Índice de roles por nombre ---
+    def get_role_index(self, guild):
+        index = self.role_indexes.get(guild.id)
+        if index is None:
+            index = self.role_indexes[guild.id] = RoleNameIndex(guild.roles)
+        return index
+
+    def resolve_role(self, guild, role_name):
+        """
+        Busca un rol por nombre sin distinguir mayúsculas. Si hay varios con el mismo nombre,
+        se prefiere el que coincide exactamente. Devuelve (rol, sugerencias) con sugerencias si no se encontró.
+        """
+        index = self.get_role_index(guild)
+        roles = [role for role in (guild.get_role(role_id) for role_id in index.lookup(role_name)) if role]
+        if roles:
+            exact = [role for role in roles if role.name == role_name]
+            return (exact or roles)[0], []
+        suggestions = [guild.get_role(role_id) for role_id in index.suggest(role_name, limit=5)]
+        return None, [role for role in suggestions if role]
+
+    def role_not_found_message(self, role_name, suggestions):
+        message = f"❌ No se encontró el rol `{role_name}`."
+        if suggestions:
+            message += " ¿Quisiste decir " + ", ".join(f"`{role.name}`" for role in suggestions) + "?"
+        return message
+
+    async def role_autocomplete(self, interaction: discord.Interaction, current: str):
+        if interaction.guild is None:
+            return []
+        index = self.get_role_index(interaction.guild)
+        return [
+            app_commands.Choice(name=index.display_names[role_id][:100], value=str(role_id))
+            for role_id in index.suggest(current)
+        ]
+
+    def resolve_role_option(self, guild, value):
+        """Resuelve el valor de una opción con autocompletado (ID del rol o nombre escrito a mano)."""
+        if value.isdigit():
+            role = guild.get_role(int(value))
+            if role:
+                return role, []
+        return self.resolve_role(guild, value)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        index = self.role_indexes.get(role.guild.id)
+        if index:
+            index.add(role)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        index = self.role_indexes.get(after.guild.id)
+        if index and before.name != after.name:
+            index.remove(before.id, before.name)
+            index.add(after)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        index = self.role_indexes.get(role.guild.id)
+        if index:
+            index.remove(role.id, role.name)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        # Tras una caída del servidor los roles pudieron cambiar sin eventos: reconstruir desde la caché nueva
+        self.role_indexes[guild.id] = RoleNameIndex(guild.roles)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.role_indexes[guild.id] = RoleNameIndex(guild.roles)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.role_indexes.pop(guild.id, None)
+
+    # --- Comandos de Prefijo para Roles ---
 
     @commands.command(name='addrole')
     @commands.has_permissions(manage_roles=True)
@@ -15,10 +324,10 @@ class Roles(commands.Cog):
         [Prefijo] Añade un rol a un miembro.
         Uso: !addrole @usuario <nombre del rol>
         """
-        role = discord.utils.get(ctx.guild.roles, name=role_name)
+        role, suggestions = self.resolve_role(ctx.guild, role_name)
 
         if not role:
-            return await ctx.send(f"❌ No se encontró el rol `{role_name}`.")
+            return await ctx.send(self.role_not_found_message(role_name, suggestions))
 
         if role.position >= ctx.guild.me.top_role.position:
             return await ctx.send(f"❌ No puedo asignar el rol `{role.name}` porque está por encima o al mismo nivel que mi rol más alto.")
@@ -41,10 +350,10 @@ class Roles(commands.Cog):
         [Prefijo] Quita un rol a un miembro.
         Uso: !removerole @usuario <nombre del rol>
         """
-        role = discord.utils.get(ctx.guild.roles, name=role_name)
+        role, suggestions = self.resolve_role(ctx.guild, role_name)
 
         if not role:
-            return await ctx.send(f"❌ No se encontró el rol `{role_name}`.")
+            return await ctx.send(self.role_not_found_message(role_name, suggestions))
 
         if role.position >= ctx.guild.me.top_role.position:
             return await ctx.send(f"❌ No puedo quitar el rol `{role.name}` porque está por encima o al mismo nivel que mi rol más alto.")
@@ -63,9 +372,10 @@ class Roles(commands.Cog):
     # --- Comandos de Barra (Slash Commands) para Roles (Corregidos) ---
 
     @app_commands.command(name="addrole", description="Asigna un rol a un miembro del servidor.")
-    @app_commands.describe(member="El miembro al que se le asignará el rol.", role="El rol a asignar.")
+    @app_commands.describe(member="El miembro al que se le asignará el rol.", role="El rol a asignar (escribe para buscarlo).")
+    @app_commands.autocomplete(role=role_autocomplete)
     @app_commands.default_permissions(manage_roles=True)
-    async def add_role_slash(self, interaction: discord.Interaction, member: discord.Member, role: discord.Role):
+    async def add_role_slash(self, interaction: discord.Interaction, member: discord.Member, role: str):
         """
         [Barra] Asigna un rol a un miembro del servidor.
         """
@@ -77,6 +387,11 @@ class Roles(commands.Cog):
             # Usa followup.send() después de deferir
             return await interaction.followup.send("Este comando solo puede ser usado en un servidor.", ephemeral=True)
 
+        role_value = role
+        role, suggestions = self.resolve_role_option(interaction.guild, role_value)
+        if not role:
+            return await interaction.followup.send(self.role_not_found_message(role_value, suggestions), ephemeral=True)
+
         # Verificar la jerarquía de roles del bot y del rol a asignar
         if role.position >= interaction.guild.me.top_role.position:
             return await interaction.followup.send(
@@ -102,9 +417,10 @@ class Roles(commands.Cog):
             await interaction.followup.send(f"❌ Ocurrió un error al añadir el rol: {e}", ephemeral=True)
 
     @app_commands.command(name="removerole", description="Quita un rol a un miembro del servidor.")
-    @app_commands.describe(member="El miembro al que se le quitará el rol.", role="El rol a quitar.")
+    @app_commands.describe(member="El miembro al que se le quitará el rol.", role="El rol a quitar (escribe para buscarlo).")
+    @app_commands.autocomplete(role=role_autocomplete)
     @app_commands.default_permissions(manage_roles=True)
-    async def remove_role_slash(self, interaction: discord.Interaction, member: discord.Member, role: discord.Role):
+    async def remove_role_slash(self, interaction: discord.Interaction, member: discord.Member, role: str):
         """
         [Barra] Quita un rol a un miembro del servidor.
         """
@@ -114,6 +430,11 @@ class Roles(commands.Cog):
         if interaction.guild is None:
             return await interaction.followup.send("Este comando solo puede ser usado en un servidor.", ephemeral=True)
 
+        role_value = role
+        role, suggestions = self.resolve_role_option(interaction.guild, role_value)
+        if not role:
+            return await interaction.followup.send(self.role_not_found_message(role_value, suggestions), ephemeral=True)
+
         if role.position >= interaction.guild.me.top_role.position:
             return await interaction.followup.send(
                 f"❌ No puedo quitar el rol `{role.name}` porque está por encima o al mismo nivel que mi rol más alto. Mueve mi rol por encima del rol `{role.name}` en la jerarquía de roles del servidor.",
@@ -136,6 +457,106 @@ class Roles(commands.Cog):
         except Exception as e:
             await interaction.followup.send(f"❌ Ocurrió un error al quitar el rol: {e}", ephemeral=True)
 
+    # --- Roles masivos (/bulkrole) ---
+    async def start_bulk_role_job(self, interaction, action, role, has_role, joined_after, everyone):
+        await interaction.response.defer(ephemeral=True)
+        if self.bot.db is None:
+            return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
+
+        if role.position >= interaction.guild.me.top_role.position or role.managed:
+            return await interaction.followup.send(f"❌ No puedo gestionar el rol `{role.name}` porque está por encima o al mismo nivel que mi rol más alto (o es un rol gestionado por una integración).", ephemeral=True)
+        if interaction.user.top_role.position <= role.position and interaction.user.id != interaction.guild.owner_id:
+            return await interaction.followup.send(f"❌ No puedes gestionar el rol `{role.name}` porque está por encima o al mismo nivel que tu rol más alto.", ephemeral=True)
+        if not (has_role or joined_after or everyone):
+            return await interaction.followup.send("⚠️ Indica un filtro (`has_role`, `joined_after`) o usa `everyone: True` para aplicar el cambio a todos los miembros.", ephemeral=True)
+
+        filters = {"has_role_id": has_role.id if has_role else None, "joined_after": None}
+        if joined_after:
+            try:
+                filters["joined_after"] = datetime.datetime.strptime(joined_after, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+            except ValueError:
+                return await interaction.followup.send("❌ Formato de fecha inválido. Usa `AAAA-MM-DD` (ej. `2024-09-01`).", ephemeral=True)
+
+        running = self.bulk_jobs.get(interaction.guild_id)
+        if running and running.task and not running.task.done():
+            return await interaction.followup.send("⚠️ Ya hay un trabajo de roles masivo en curso en este servidor. Consulta `/bulkrole status` o cancélalo con `/bulkrole cancel`.", ephemeral=True)
+
+        doc = {
+            "_id": uuid.uuid4().hex,
+            "guild_id": interaction.guild_id,
+            "action": action,
+            "role_id": role.id,
+            "filters": filters,
+            "requested_by": str(interaction.user),
+            "status": "running",
+            "created_at": discord.utils.utcnow(),
+            "last_member_id": 0,
+            "processed": 0,
+            "changed": 0,
+            "skipped": 0,
+            "failed": 0
+        }
+        job = BulkRoleJob(self.bot, doc)
+        doc["total"] = len(job.pending_members(interaction.guild))
+        await self.bot.db.bulk_role_jobs.insert_one(doc)
+        self.bulk_jobs[interaction.guild_id] = job
+        job.start()
+
+        verb = "añadir" if action == "add" else "quitar"
+        await interaction.followup.send(f"✅ Trabajo iniciado: {verb} el rol `{role.name}` a **{doc['total']}** miembros. Usa `/bulkrole status` para ver el progreso.", ephemeral=True)
+
+    @bulkrole.command(name="add", description="Añade un rol a todos los miembros que cumplan el filtro.")
+    @app_commands.describe(role="El rol a añadir.", has_role="Solo miembros con este rol.", joined_after="Solo miembros que entraron después de esta fecha (AAAA-MM-DD).", everyone="Aplicar a todos los miembros (si no hay otro filtro).")
+    async def bulkrole_add(self, interaction: discord.Interaction, role: discord.Role, has_role: discord.Role = None, joined_after: str = None, everyone: bool = False):
+        await self.start_bulk_role_job(interaction, "add", role, has_role, joined_after, everyone)
+
+    @bulkrole.command(name="remove", description="Quita un rol a todos los miembros que cumplan el filtro.")
+    @app_commands.describe(role="El rol a quitar.", has_role="Solo miembros con este rol.", joined_after="Solo miembros que entraron después de esta fecha (AAAA-MM-DD).", everyone="Aplicar a todos los miembros (si no hay otro filtro).")
+    async def bulkrole_remove(self, interaction: discord.Interaction, role: discord.Role, has_role: discord.Role = None, joined_after: str = None, everyone: bool = False):
+        await self.start_bulk_role_job(interaction, "remove", role, has_role, joined_after, everyone)
+
+    @bulkrole.command(name="status", description="Muestra el progreso del último trabajo de roles masivo.")
+    async def bulkrole_status(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        if self.bot.db is None:
+            return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
+
+        job = self.bulk_jobs.get(interaction.guild_id)
+        doc = job.doc if job else await self.bot.db.bulk_role_jobs.find_one({"guild_id": interaction.guild_id}, sort=[("created_at", -1)])
+        if not doc:
+            return await interaction.followup.send("ℹ️ No hay trabajos de roles masivos en este servidor.", ephemeral=True)
+
+        role = interaction.guild.get_role(doc["role_id"])
+        total = max(doc.get("total", 0), doc["processed"])
+        embed = discord.Embed(
+            title=f"📋 Rol Masivo: {'añadir' if doc['action'] == 'add' else 'quitar'} `{role.name if role else doc['role_id']}`",
+            color=discord.Color.blue() if doc["status"] == "running" else discord.Color.green() if doc["status"] == "completed" else discord.Color.red()
+        )
+        embed.add_field(name="Estado", value=doc["status"], inline=True)
+        embed.add_field(name="Progreso", value=f"{doc['processed']}/{total} ({doc['processed'] / total:.0%})" if total else "0/0", inline=True)
+        embed.add_field(name="Resultado", value=f"✅ {doc['changed']} cambiados | ⏭️ {doc['skipped']} sin cambios | ❌ {doc['failed']} errores", inline=False)
+
+        if job and doc["status"] == "running":
+            rate = job.throughput()
+            remaining = total - doc["processed"]
+            eta = f"{int(remaining / rate // 60)} min {int(remaining / rate % 60)} s" if rate > 0 else "calculando..."
+            embed.add_field(name="Velocidad", value=f"{rate * 60:.0f} miembros/min", inline=True)
+            embed.add_field(name="Tiempo Restante", value=eta, inline=True)
+        if doc.get("error"):
+            embed.add_field(name="Error", value=doc["error"], inline=False)
+        embed.set_footer(text=f"Trabajo {doc['_id']} | Solicitado por {doc['requested_by']}")
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @bulkrole.command(name="cancel", description="Cancela el trabajo de roles masivo en curso.")
+    async def bulkrole_cancel(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        job = self.bulk_jobs.get(interaction.guild_id)
+        if not job or not job.task or job.task.done():
+            return await interaction.followup.send("ℹ️ No hay ningún trabajo de roles masivo en curso.", ephemeral=True)
+        job.task.cancel()
+        await job.save(status="cancelled", finished_at=discord.utils.utcnow())
+        await interaction.followup.send(f"✅ Trabajo cancelado tras procesar {job.doc['processed']} miembros.", ephemeral=True)
+
 # Función de configuración del Cog
 async def setup(bot):
     await bot.add_cog(Roles(bot))
\ No newline at end of file
@@ -1,8 +1,17 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands, ui
 import asyncio
 import uuid 
+import datetime
+import os
+import gzip
+import json
+import html
+from collections import defaultdict, deque
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from utils.scheduling import DeadlineScheduler, as_utc
 
 # --- Constantes y configuraciones por defecto ---
 DEFAULT_TICKET_CATEGORY_NAME = "Tickets Abiertos" 
@@ -10,6 +19,43 @@ DEFAULT_TICKET_CHANNEL_PREFIX = "ticket-"
 TICKET_LOG_CHANNEL_NAME = "ticket-logs"
 TICKET_RATING_LOG_CHANNEL_NAME = "ticket-ratings" 
 SUPPORT_ROLE_NAME = "Soporte"
+RATING_TIMEOUT_SECONDS = 300 # Tiempo para valorar un ticket antes de cerrarlo sin valoración
+TICKET_DELETE_DELAY_SECONDS = 5 # Aviso antes de eliminar el canal de un ticket cerrado
+TICKET_DELETE_MAX_RETRIES = 5 # Reintentos de eliminación del canal antes de darlo por perdido
+TICKET_DELETE_RETRY_BASE_SECONDS = 30 # Espera del primer reintento; se duplica en cada uno
+
+# Estados del ciclo de vida de un ticket:
+# open -> closing (esperando valoración) -> rated / expired / cancelled -> deleted
+# open -> closed -> deleted (cierre directo sin valoración)
+ACTIVE_TICKET_STATUSES = ["open", "closing", "rated", "expired", "cancelled", "closed"]
+CLOSING_TICKET_STATUSES = ["rated", "expired", "cancelled", "closed"] # Pendientes de eliminar el canal
+
+# Transcripciones de tickets
+TRANSCRIPT_DIR = os.getenv("TICKET_TRANSCRIPT_DIR", "transcripts")
+TRANSCRIPT_PAGE_SIZE = 100 # Mensajes que se escriben a disco de una vez (la memoria no crece con la longitud del ticket)
+TRANSCRIPT_GRIDFS_BUCKET = "ticket_transcripts"
+TRANSCRIPT_UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Pool de canales pre-creados por tipo de ticket
+POOL_CHANNEL_PREFIX = "ticket-pool-"
+MAX_TICKET_POOL_SIZE = 10
+
+# Categorías de desbordamiento: Discord no admite más de 50 canales por categoría
+CATEGORY_CHANNEL_LIMIT = 50
+
+# Cola de admisión para abrir tickets
+TICKET_OPEN_CONCURRENCY = 2 # Aperturas simultáneas por servidor (limita las ráfagas de creación de canales)
+
+# Estadísticas de tickets: límites (en segundos) del histograma de tiempo hasta reclamar
+CLAIM_TIME_BUCKETS = [60, 300, 900, 1800, 3600, 7200, 21600, 86400]
+MAX_TICKET_STATS_DAYS = 90
+
+# Cierre automático por inactividad
+TICKET_INACTIVITY_WARNING_SECONDS = 48 * 3600 # Sin mensajes durante este tiempo se avisa en el ticket
+TICKET_INACTIVITY_CLOSE_SECONDS = 24 * 3600 # Tras el aviso, se cierra si sigue sin actividad
+TICKET_ACTIVITY_FLUSH_SECONDS = 60 # La actividad se escribe en lote, no por cada mensaje
+TICKET_SWEEP_INTERVAL_MINUTES = 10
+TICKET_SWEEP_BATCH_SIZE = 25 # Tickets avisados/cerrados como máximo por barrido
 
 # --- Vistas (UI) para el sistema de tickets ---
 
@@ -39,9 +85,27 @@ class ClaimTicketButton(ui.View):
         if not (is_support_member or interaction.user.guild_permissions.manage_channels):
             return await interaction.followup.send("❌ Solo el personal de soporte o un administrador pueden reclamar este ticket.", ephemeral=True)
 
-        # Deshabilitar el botón una vez reclamado
-        button.disabled = True
-        await interaction.message.edit(view=self) # Editar el mensaje para deshabilitar el botón
+        if await cog.registry.get(interaction.channel.id) is None:
+            # Ticket abierto antes del registro que el backfill aún no ha alcanzado
+            await cog.adopt_legacy_ticket(interaction.channel, settings)
+
+        claimed_at = discord.utils.utcnow()
+        ticket, won = await cog.registry.claim(interaction.channel.id, interaction.user.id, claimed_at)
+        if not won:
+            # Otro miembro del staff se adelantó: solo se responde al que llegó tarde, sin escribir en Discord
+            if ticket and ticket.get("claimed_by"):
+                return await interaction.followup.send(f"⚠️ Este ticket ya fue reclamado por <@{ticket['claimed_by']}>.", ephemeral=True)
+            return await interaction.followup.send("⚠️ Este ticket ya no se puede reclamar.", ephemeral=True)
+
+        await cog.analytics.record(
+            "claim", ticket, actor_id=interaction.user.id, staff_id=interaction.user.id, at=claimed_at,
+            claim_seconds=int((claimed_at - as_utc(ticket["opened_at"])).total_seconds())
+        )
+
+        # Deshabilitar el botón una vez reclamado (con una vista nueva: esta instancia es la persistente compartida)
+        claimed_view = ClaimTicketButton(self.bot)
+        claimed_view.claim_ticket.disabled = True
+        await interaction.message.edit(view=claimed_view) # Editar el mensaje para deshabilitar el botón
 
         # Notificar en el ticket que ha sido reclamado
         claim_embed = discord.Embed(
@@ -84,37 +148,27 @@ class TicketTypeSelect(ui.Select):
         )
 
     async def callback(self, interaction: discord.Interaction):
-        # Deferir la interacción inmediatamente para evitar "La interacción ha fallado"
-        await interaction.response.defer(ephemeral=True)
-
         cog = self.view.bot.get_cog("Tickets") # Acceder al bot a través de la vista
         if not cog:
-            return await interaction.followup.send("❌ Error interno: El módulo de tickets no está cargado.", ephemeral=True)
+            return await interaction.response.send_message("❌ Error interno: El módulo de tickets no está cargado.", ephemeral=True)
 
+        # La configuración se resuelve al hacer clic (desde la caché), no desde la vista registrada,
+        # así que el panel sigue al día tras un reinicio o al cambiar los tipos de ticket.
+        settings = await cog.get_ticket_settings(interaction.guild_id)
+        ticket_types_config = settings.get("ticket_types", {})
         selected_type = self.values[0]
-        ticket_type_config = self.view.ticket_types_config.get(selected_type)
+        ticket_type_config = ticket_types_config.get(selected_type)
 
         if not ticket_type_config:
-            return await interaction.followup.send("❌ Error: Tipo de ticket seleccionado no encontrado. Por favor, contacta a un administrador.", ephemeral=True)
+            return await interaction.response.send_message("❌ Error: Tipo de ticket seleccionado no encontrado. Por favor, contacta a un administrador.", ephemeral=True)
 
-        try:
-            # Llama a la lógica de creación de ticket directamente
-            await cog.create_ticket_channel(interaction, selected_type, ticket_type_config)
-            
-            # Resetear el select para que el usuario pueda abrir otro ticket
-            self.placeholder = "Selecciona el tipo de ticket para abrirlo..."
-            self.disabled = False # Asegúrate de que no se deshabilite accidentalmente
-            for opt in self.options:
-                opt.default = False # Desmarcar cualquier opción por defecto
-            
-            # Editar el mensaje para "resetear" el select
-            # IMPORTANTE: Si quieres que el menú esté "listo para otra selección", debes enviar un nuevo mensaje o editar el actual
-            # para que el Select menu no muestre la selección anterior como fija.
-            # Una forma simple es editar el mensaje principal (el panel) para resetear el select:
-            await interaction.message.edit(view=TicketPanel(self.view.bot, self.view.ticket_types_config)) # Envía una nueva instancia de la vista para "resetear"
-            # Si esto causa problemas, otra opción es hacer un seguimiento de interacciones y solo dejar una selección activa.
-            # Por simplicidad, volvemos a enviar la vista para que el select se vea como nuevo.
+        # La propia respuesta a la interacción resetea el select (sin una llamada extra a message.edit)
+        # y de paso actualiza las opciones del panel con la configuración actual.
+        await interaction.response.edit_message(view=TicketPanel(self.view.bot, ticket_types_config))
 
+        try:
+            # La apertura pasa por la cola de admisión del servidor (deduplica clics repetidos)
+            await cog.admission.submit(interaction, selected_type, ticket_type_config)
         except Exception as e:
             print(f"Error al abrir ticket desde el select menu: {e}")
             await interaction.followup.send(f"❌ Ocurrió un error al abrir el ticket: {e}", ephemeral=True)
@@ -137,102 +191,76 @@ class TicketPanel(ui.View):
         return True
 
 
-# Clase para el sistema de calificación EN EL CANAL del ticket
-class TicketRatingViewInChannel(ui.View):
-    def __init__(self, bot, ticket_creator_id, original_guild_id):
-        super().__init__(timeout=300) # 5 minutos para calificar
+# Modal para el comentario opcional de la valoración
+class RatingCommentModal(ui.Modal):
+    comment_input = ui.TextInput(
+        label="Tu comentario (opcional)",
+        style=discord.TextStyle.paragraph,
+        placeholder="¡Gracias por tu ayuda!",
+        required=False,
+        max_length=500
+    )
+
+    def __init__(self, bot, rating):
+        super().__init__(title=f"Calificación de Ticket: {rating}/5")
         self.bot = bot
-        self.ticket_creator_id = ticket_creator_id
-        self.original_guild_id = original_guild_id # Para acceder a la configuración del guild
-        self.rating = None
-        self.rated = asyncio.Event() # Evento para indicar si se ha calificado
+        self.rating = rating
+
+    async def on_submit(self, modal_interaction: discord.Interaction):
+        comment = self.comment_input.value if self.comment_input.value else "Sin comentario."
+        await modal_interaction.response.defer(ephemeral=True)
+
+        cog = self.bot.get_cog("Tickets")
+        if not cog:
+            return await modal_interaction.followup.send("❌ Error interno al registrar la valoración.", ephemeral=True)
 
-        # Botones de calificación
-        for i in range(1, 6):
-            self.add_item(ui.Button(label=str(i), style=discord.ButtonStyle.blurple, custom_id=f"rating_in_channel_{i}"))
-        
-        # Botón para cancelar valoración (solo staff)
-        self.add_item(ui.Button(label="Cancelar Valoración y Cerrar", style=discord.ButtonStyle.grey, emoji="✖️", custom_id="cancel_rating_close_ticket"))
-
-    async def on_timeout(self):
-        # Deshabilitar todos los botones si el tiempo expira
-        for item in self.children:
-            if isinstance(item, ui.Button):
-                item.disabled = True
         try:
-            # Editar el mensaje original para deshabilitar los botones
-            await self.message.edit(content="El tiempo para calificar ha expirado. El ticket no se cerrará automáticamente.", view=self)
-        except discord.NotFound:
-            pass # El mensaje ya pudo haber sido eliminado
-        finally:
-            self.rated.set() # Marcar como completado para liberar la espera, incluso si no se calificó
-
-    # Botones de calificación (decoradores para los custom_id definidos en el init)
-    @ui.button(label="1", style=discord.ButtonStyle.blurple, custom_id="rating_in_channel_1")
-    @ui.button(label="2", style=discord.ButtonStyle.blurple, custom_id="rating_in_channel_2")
-    @ui.button(label="3", style=discord.ButtonStyle.blurple, custom_id="rating_in_channel_3")
-    @ui.button(label="4", style=discord.ButtonStyle.blurple, custom_id="rating_in_channel_4")
-    @ui.button(label="5", style=discord.ButtonStyle.blurple, custom_id="rating_in_channel_5")
-    async def rating_button_callback(self, interaction: discord.Interaction, button: ui.Button):
+            if await cog.complete_rating(modal_interaction.channel, modal_interaction.user, self.rating, comment):
+                await modal_interaction.followup.send("✅ ¡Gracias por tu valoración! Tu opinión es importante.", ephemeral=True)
+            else:
+                await modal_interaction.followup.send("⚠️ Este ticket ya no está pendiente de valoración.", ephemeral=True)
+        except Exception as e:
+            print(f"Error al registrar valoración y cerrar ticket: {e}")
+            await modal_interaction.followup.send(f"❌ Ocurrió un error al procesar la valoración o cerrar el ticket: {e}", ephemeral=True)
+
+
+# Botón de calificación (1-5)
+class RatingButton(ui.Button):
+    def __init__(self, rating, disabled=False):
+        super().__init__(label=str(rating), style=discord.ButtonStyle.blurple, custom_id=f"rating_in_channel_{rating}", disabled=disabled)
+        self.rating = rating
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = self.view.bot.get_cog("Tickets")
+        if not cog:
+            return await interaction.response.send_message("❌ Error interno: El módulo de tickets no está cargado.", ephemeral=True)
+
+        # El estado del cierre se busca por canal, así que los botones siguen funcionando tras un reinicio
+        ticket = await cog.registry.get(interaction.channel.id)
+        if not ticket or ticket.get("status") != "closing":
+            return await interaction.response.send_message("⚠️ Este ticket ya no está pendiente de valoración.", ephemeral=True)
+
         # Asegurarse de que solo el creador del ticket pueda calificar
-        if interaction.user.id != self.ticket_creator_id:
-            await interaction.response.send_message("❌ Solo el creador de este ticket puede calificar.", ephemeral=True)
-            return
+        if interaction.user.id != ticket["creator_id"]:
+            return await interaction.response.send_message("❌ Solo el creador de este ticket puede calificar.", ephemeral=True)
+
+        await interaction.response.send_modal(RatingCommentModal(self.view.bot, self.rating))
 
-        self.rating = int(button.label)
-        for item in self.children:
-            if isinstance(item, ui.Button):
-                item.disabled = True # Deshabilitar todos los botones después de una selección
-
-        # Pedir un comentario opcional
-        class RatingCommentModal(ui.Modal, title=f"Calificación de Ticket: {self.rating}/5"):
-            comment_input = ui.TextInput(
-                label="Tu comentario (opcional)",
-                style=discord.TextStyle.paragraph,
-                placeholder="¡Gracias por tu ayuda!",
-                required=False,
-                max_length=500
-            )
 
-            async def on_submit(self, modal_interaction: discord.Interaction):
-                comment = self.comment_input.value if self.comment_input.value else "Sin comentario."
-                await modal_interaction.response.defer(ephemeral=True)
-
-                cog = self.view.bot.get_cog("Tickets")
-                if cog:
-                    try:
-                        # Log la calificación en el canal de logs de valoración
-                        # El canal del ticket actual es interaction.channel
-                        await cog.log_ticket_rating(
-                            modal_interaction.user,
-                            self.view.rating,
-                            comment,
-                            interaction.channel.id, # ID del canal actual
-                            self.view.ticket_creator_id,
-                            interaction.guild
-                        )
-                        await modal_interaction.followup.send("✅ ¡Gracias por tu valoración! Tu opinión es importante.", ephemeral=True)
-                        
-                        # Editar el mensaje de calificación en el canal para mostrar que ya se calificó
-                        await modal_interaction.message.edit(content=f"Gracias por calificar el ticket con **{self.view.rating}/5**. Comentario: '{comment}'", view=self.view)
-                        
-                        # Cerrar el ticket después de la calificación
-                        await cog.handle_ticket_close_final(interaction.channel, modal_interaction.user, reason=f"Cerrado después de valoración ({self.view.rating}/5)")
-
-                    except Exception as e:
-                        print(f"Error al registrar valoración y cerrar ticket: {e}")
-                        await modal_interaction.followup.send(f"❌ Ocurrió un error al procesar la valoración o cerrar el ticket: {e}", ephemeral=True)
-                else:
-                    await modal_interaction.followup.send("❌ Error interno al registrar la valoración.", ephemeral=True)
-                
-                self.view.stop() # Detener la vista y el timeout
-                self.view.rated.set() # Marcar como completado
-
-        modal = RatingCommentModal()
-        modal.view = self
-        await interaction.response.send_modal(modal)
-
-    @ui.button(label="Cancelar Valoración y Cerrar", style=discord.ButtonStyle.grey, emoji="✖️", custom_id="cancel_rating_close_ticket")
+# Clase para el sistema de calificación EN EL CANAL del ticket.
+# Es una vista persistente sin estado: el creador y el estado del cierre se leen del registro de tickets.
+class TicketRatingViewInChannel(ui.View):
+    def __init__(self, bot, disabled=False):
+        super().__init__(timeout=None)
+        self.bot = bot
+
+        # Botones de calificación
+        for i in range(1, 6):
+            self.add_item(RatingButton(i, disabled=disabled))
+        self.cancel_rating_close_ticket_callback.disabled = disabled
+
+    # Botón para cancelar valoración (solo staff)
+    @ui.button(label="Cancelar Valoración y Cerrar", style=discord.ButtonStyle.grey, emoji="✖️", custom_id="cancel_rating_close_ticket", row=1)
     async def cancel_rating_close_ticket_callback(self, interaction: discord.Interaction, button: ui.Button):
         await interaction.response.defer(ephemeral=True)
 
@@ -252,39 +280,994 @@ class TicketRatingViewInChannel(ui.View):
         if not (is_support_member or interaction.user.guild_permissions.manage_channels):
             return await interaction.followup.send("❌ Solo el personal de soporte o un administrador pueden cancelar la valoración.", ephemeral=True)
 
-        # Deshabilitar todos los botones
-        for item in self.children:
-            if isinstance(item, ui.Button):
-                item.disabled = True
-        await interaction.message.edit(view=self)
-
-        await interaction.followup.send("Valoración cancelada. El ticket será cerrado.", ephemeral=True)
-        
         # Cerrar el ticket sin valoración
         try:
-            await cog.handle_ticket_close_final(interaction.channel, interaction.user, reason="Valoración cancelada por el staff.")
+            if await cog.cancel_rating(interaction.channel, interaction.user):
+                await interaction.followup.send("Valoración cancelada. El ticket será cerrado.", ephemeral=True)
+            else:
+                await interaction.followup.send("⚠️ Este ticket ya no está pendiente de valoración.", ephemeral=True)
         except Exception as e:
             print(f"Error al cerrar ticket desde cancelar valoración: {e}")
             await interaction.followup.send(f"❌ Ocurrió un error al cerrar el ticket: {e}", ephemeral=True)
-        
-        self.stop() # Detener la vista y el timeout
-        self.rated.set() # Marcar como completado
+
+
+# --- Registro de tickets ---
+class TicketRegistry:
+    """
+    Registro de tickets en Mongo (colección `tickets`, indexada por guild_id, creator_id y status).
+    Cada ticket es un documento con _id = ID del canal, creator_id, type, opened_at, claimed_by y status.
+    Los documentos se cachean por canal y los tickets abiertos también por (servidor, creador),
+    así que cerrar, reclamar, valorar o comprobar duplicados no necesita leer el nombre del canal.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.by_channel = {} # channel_id -> documento del ticket
+        self.open_by_user = {} # (guild_id, creator_id) -> channel_id
+        self.dirty_activity = {} # channel_id -> último mensaje aún no guardado
+
+    async def load(self):
+        if self.bot.db is None:
+            return
+        try:
+            await self.bot.db.tickets.create_index([("guild_id", ASCENDING), ("creator_id", ASCENDING), ("status", ASCENDING)])
+            await self.bot.db.tickets.create_index([("status", ASCENDING), ("deadline", ASCENDING)])
+            await self.bot.db.tickets.create_index([("status", ASCENDING), ("last_activity", ASCENDING)])
+            # Tickets abiertos antes de registrar la actividad: se parte de su fecha de apertura
+            await self.bot.db.tickets.update_many(
+                {"status": "open", "last_activity": {"$exists": False}},
+                [{"$set": {"last_activity": "$opened_at", "inactivity_warned_at": None}}]
+            )
+            async for doc in self.bot.db.tickets.find({"status": {"$in": ACTIVE_TICKET_STATUSES}}):
+                self._cache(doc)
+            print(f"TicketRegistry: {len(self.by_channel)} tickets activos cargados desde la base de datos.")
+        except Exception as e:
+            print(f"ERROR al cargar el registro de tickets: {e}")
+
+    def _cache(self, doc):
+        self.by_channel[doc["_id"]] = doc
+        # Un usuario no puede abrir otro ticket hasta que el canal del anterior se elimine
+        if doc.get("status") in ACTIVE_TICKET_STATUSES:
+            self.open_by_user[(doc["guild_id"], doc["creator_id"])] = doc["_id"]
+
+    def _release_user(self, doc):
+        key = (doc["guild_id"], doc["creator_id"])
+        if self.open_by_user.get(key) == doc["_id"]:
+            del self.open_by_user[key]
+
+    def find_open_ticket(self, guild_id, creator_id):
+        """Devuelve el ID del canal del ticket abierto del usuario, o None."""
+        return self.open_by_user.get((guild_id, creator_id))
+
+    async def get(self, channel_id):
+        """Devuelve el documento del ticket de un canal (desde la caché si es posible), o None."""
+        doc = self.by_channel.get(channel_id)
+        if doc is None and self.bot.db is not None:
+            doc = await self.bot.db.tickets.find_one({"_id": channel_id})
+            if doc and doc.get("status") != "deleted":
+                self._cache(doc)
+        return doc
+
+    async def register(self, channel, creator_id, ticket_type):
+        doc = {
+            "_id": channel.id,
+            "guild_id": channel.guild.id,
+            "creator_id": creator_id,
+            "type": ticket_type,
+            "opened_at": discord.utils.utcnow(),
+            "claimed_by": None,
+            "status": "open",
+            "last_activity": discord.utils.utcnow(),
+            "inactivity_warned_at": None
+        }
+        self._cache(doc)
+        if self.bot.db is not None:
+            await self.bot.db.tickets.replace_one({"_id": channel.id}, doc, upsert=True)
+        return doc
+
+    async def adopt(self, channel, creator_id, ticket_type):
+        """
+        Registra un ticket abierto antes de que existiera el registro (canal ticket-* sin documento).
+        No pisa un documento existente: si el canal ya estaba registrado, devuelve ese documento.
+        """
+        fields = {
+            "guild_id": channel.guild.id,
+            "creator_id": creator_id,
+            "type": ticket_type,
+            "opened_at": channel.created_at,
+            "claimed_by": None,
+            "status": "open",
+            # La última actividad se aproxima con el último mensaje del canal
+            "last_activity": discord.utils.snowflake_time(channel.last_message_id) if channel.last_message_id else channel.created_at,
+            "inactivity_warned_at": None,
+            "adopted_at": discord.utils.utcnow()
+        }
+        if self.bot.db is not None:
+            doc = await self.bot.db.tickets.find_one_and_update(
+                {"_id": channel.id},
+                {"$setOnInsert": fields},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        else:
+            doc = self.by_channel.get(channel.id) or dict(fields, _id=channel.id)
+        if doc.get("status") in ACTIVE_TICKET_STATUSES:
+            self._cache(doc)
+        return doc
+
+    async def update(self, channel_id, **fields):
+        doc = self.by_channel.get(channel_id)
+        if doc:
+            doc.update(fields)
+        if self.bot.db is not None:
+            await self.bot.db.tickets.update_one({"_id": channel_id}, {"$set": fields})
+
+    def touch(self, channel_id, at):
+        """Marca actividad en el ticket solo en memoria; `flush_activity` la escribe en lote."""
+        doc = self.by_channel.get(channel_id)
+        if doc is None or doc.get("status") != "open":
+            return False
+        doc["last_activity"] = at
+        doc["inactivity_warned_at"] = None
+        self.dirty_activity[channel_id] = at
+        return True
+
+    async def flush_activity(self):
+        if not self.dirty_activity:
+            return
+        pending, self.dirty_activity = self.dirty_activity, {}
+        if self.bot.db is None:
+            return
+        try:
+            await self.bot.db.tickets.bulk_write([
+                UpdateOne(
+                    {"_id": channel_id, "last_activity": {"$lt": at}},
+                    {"$set": {"last_activity": at, "inactivity_warned_at": None}}
+                )
+                for channel_id, at in pending.items()
+            ], ordered=False)
+        except Exception as e:
+            print(f"ERROR al guardar la actividad de {len(pending)} tickets: {e}")
+            for channel_id, at in pending.items():
+                self.dirty_activity.setdefault(channel_id, at) # Reintentar en el siguiente lote
+
+    async def find_inactive(self, inactive_since, warned, limit):
+        """
+        Tickets abiertos sin actividad desde `inactive_since` (por el índice status + last_activity).
+        Con warned=True solo devuelve los ya avisados; con False, los que aún no tienen aviso.
+        """
+        warned_filter = {"$ne": None} if warned else None
+        if self.bot.db is not None:
+            cursor = self.bot.db.tickets.find(
+                {"status": "open", "last_activity": {"$lt": inactive_since}, "inactivity_warned_at": warned_filter}
+            ).sort("last_activity", ASCENDING).limit(limit)
+            return [self.by_channel.get(doc["_id"], doc) async for doc in cursor]
+
+        stale = [
+            doc for doc in self.by_channel.values()
+            if doc.get("status") == "open"
+            and as_utc(doc.get("last_activity") or doc["opened_at"]) < inactive_since
+            and (doc.get("inactivity_warned_at") is not None) == warned
+        ]
+        return sorted(stale, key=lambda doc: doc.get("last_activity") or doc["opened_at"])[:limit]
+
+    async def claim(self, channel_id, staff_id, claimed_at):
+        """
+        Reclama el ticket solo si nadie lo ha reclamado aún (comparar y asignar atómico en Mongo).
+        Devuelve (documento, True) si este staff ganó, o (documento actual, False) si ya estaba reclamado.
+        """
+        doc = self.by_channel.get(channel_id)
+        if doc and doc.get("claimed_by"):
+            return doc, False # Respuesta rápida sin ir a la base de datos
+
+        if self.bot.db is not None:
+            claimed = await self.bot.db.tickets.find_one_and_update(
+                {"_id": channel_id, "claimed_by": None, "status": "open"},
+                {"$set": {"claimed_by": staff_id, "claimed_at": claimed_at}},
+                return_document=ReturnDocument.AFTER
+            )
+            if claimed is not None:
+                self._cache(claimed)
+                return claimed, True
+            current = await self.bot.db.tickets.find_one({"_id": channel_id})
+            if current and current.get("status") in ACTIVE_TICKET_STATUSES:
+                self._cache(current)
+            return current, False
+
+        if doc is None or doc.get("status") != "open":
+            return doc, False
+        doc.update(claimed_by=staff_id, claimed_at=claimed_at)
+        return doc, True
+
+    async def transition(self, channel_id, from_statuses, to_status, **fields):
+        """
+        Cambia el estado del ticket solo si está en uno de `from_statuses` (de forma atómica en Mongo).
+        Devuelve el documento actualizado, o None si otro proceso ya lo cambió.
+        """
+        fields["status"] = to_status
+        if self.bot.db is not None:
+            doc = await self.bot.db.tickets.find_one_and_update(
+                {"_id": channel_id, "status": {"$in": from_statuses}},
+                {"$set": fields},
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                return None
+            self._cache(doc)
+            return doc
+
+        doc = self.by_channel.get(channel_id)
+        if doc is None or doc.get("status") not in from_statuses:
+            return None
+        doc.update(fields)
+        return doc
+
+    async def mark_deleted(self, channel_id):
+        """Último estado del ticket: el canal ya no existe. Libera al creador para abrir otro ticket."""
+        doc = self.by_channel.pop(channel_id, None)
+        if doc:
+            self._release_user(doc)
+        if self.bot.db is not None:
+            await self.bot.db.tickets.update_one(
+                {"_id": channel_id, "status": {"$ne": "deleted"}},
+                {"$set": {"status": "deleted", "deleted_at": discord.utils.utcnow()}}
+            )
+
+
+# --- Exportador de transcripciones ---
+class TicketTranscriptExporter:
+    """
+    Exporta el historial de un canal de ticket antes de eliminarlo.
+    Lee `channel.history()` como flujo y escribe por páginas en JSONL comprimido con gzip
+    (y opcionalmente en HTML), así que la memoria usada no depende de la longitud del ticket.
+    Los archivos quedan en disco o se suben a GridFS (bucket `ticket_transcripts`).
+    """
+    def __init__(self, bot):
+        self.bot = bot
+
+    @staticmethod
+    def serialize(message):
+        return {
+            "id": message.id,
+            "author_id": message.author.id,
+            "author": str(message.author),
+            "bot": message.author.bot,
+            "created_at": message.created_at.isoformat(),
+            "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+            "content": message.content,
+            "attachments": [attachment.url for attachment in message.attachments],
+            "embeds": [embed.title or embed.description or "" for embed in message.embeds]
+        }
+
+    @staticmethod
+    def render_html(record):
+        content = html.escape(record["content"]).replace("\n", "<br>")
+        extras = "".join(f'<div class="att"><a href="{html.escape(url)}">{html.escape(url)}</a></div>' for url in record["attachments"])
+        extras += "".join(f'<div class="embed">{html.escape(text)}</div>' for text in record["embeds"] if text)
+        return (
+            f'<div class="msg"><span class="author">{html.escape(record["author"])}</span> '
+            f'<span class="time">{record["created_at"]}</span><div class="content">{content}</div>{extras}</div>\n'
+        )
+
+    @staticmethod
+    def _write_page(jsonl_file, html_file, lines, html_parts):
+        jsonl_file.write("\n".join(lines) + "\n")
+        if html_file:
+            html_file.write("".join(html_parts))
+
+    async def export(self, channel, include_html=False, storage="disk"):
+        """
+        Exporta el canal y devuelve {"message_count", "storage", "files": [{"name", "path", "size", "gridfs_id"}]}.
+        Con storage="gridfs" los archivos locales se conservan hasta llamar a `cleanup` (para poder adjuntarlos al log).
+        """
+        await asyncio.to_thread(os.makedirs, TRANSCRIPT_DIR, exist_ok=True)
+        base_name = f"ticket-{channel.guild.id}-{channel.id}"
+        paths = [os.path.join(TRANSCRIPT_DIR, f"{base_name}.jsonl.gz")]
+        if include_html:
+            paths.append(os.path.join(TRANSCRIPT_DIR, f"{base_name}.html"))
+
+        jsonl_file = await asyncio.to_thread(gzip.open, paths[0], "wt", encoding="utf-8")
+        html_file = await asyncio.to_thread(open, paths[1], "w", encoding="utf-8") if include_html else None
+        message_count = 0
+        try:
+            if html_file:
+                await asyncio.to_thread(html_file.write,
+                    f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>#{html.escape(channel.name)}</title>"
+                    "<style>body{font-family:sans-serif;background:#313338;color:#dbdee1}.msg{margin:6px 0}"
+                    ".author{font-weight:bold}.time{color:#949ba4;font-size:.8em}.embed{border-left:3px solid #5865f2;padding-left:6px}</style>"
+                    f"</head><body><h1>#{html.escape(channel.name)}</h1>\n")
+
+            lines, html_parts = [], []
+            async for message in channel.history(limit=None, oldest_first=True):
+                record = self.serialize(message)
+                lines.append(json.dumps(record, ensure_ascii=False))
+                if html_file:
+                    html_parts.append(self.render_html(record))
+                message_count += 1
+                if len(lines) >= TRANSCRIPT_PAGE_SIZE:
+                    await asyncio.to_thread(self._write_page, jsonl_file, html_file, lines, html_parts)
+                    lines, html_parts = [], []
+            if lines:
+                await asyncio.to_thread(self._write_page, jsonl_file, html_file, lines, html_parts)
+            if html_file:
+                await asyncio.to_thread(html_file.write, "</body></html>\n")
+        finally:
+            await asyncio.to_thread(jsonl_file.close)
+            if html_file:
+                await asyncio.to_thread(html_file.close)
+
+        files = []
+        for path in paths:
+            files.append({
+                "name": os.path.basename(path),
+                "path": path,
+                "size": await asyncio.to_thread(os.path.getsize, path),
+                "gridfs_id": None
+            })
+
+        if storage == "gridfs" and self.bot.db is not None:
+            bucket = AsyncIOMotorGridFSBucket(self.bot.db, bucket_name=TRANSCRIPT_GRIDFS_BUCKET)
+            for file_info in files:
+                file_info["gridfs_id"] = await self._upload(bucket, file_info, channel)
+        else:
+            storage = "disk"
+
+        return {"message_count": message_count, "storage": storage, "files": files}
+
+    @staticmethod
+    async def _upload(bucket, file_info, channel):
+        grid_in = bucket.open_upload_stream(
+            file_info["name"],
+            metadata={"guild_id": channel.guild.id, "channel_id": channel.id}
+        )
+        with open(file_info["path"], "rb") as source:
+            while True:
+                chunk = await asyncio.to_thread(source.read, TRANSCRIPT_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await grid_in.write(chunk)
+        await grid_in.close()
+        return grid_in._id
+
+    @staticmethod
+    async def cleanup(transcript):
+        """Borra las copias locales de una transcripción ya subida a GridFS."""
+        if transcript["storage"] != "gridfs":
+            return
+        for file_info in transcript["files"]:
+            try:
+                await asyncio.to_thread(os.remove, file_info["path"])
+            except OSError:
+                pass
+
+
+# --- Pool de canales pre-creados ---
+class TicketChannelPool:
+    """
+    Canales ocultos creados de antemano en la categoría de cada tipo de ticket (colección `ticket_pool`).
+    Abrir un ticket con un canal del pool solo necesita una edición (nombre + permisos) en lugar de
+    crear el canal, y el pool se rellena en segundo plano. El tamaño se configura por tipo con /setticketpool.
+    Cada canal del pool ocupa un hueco de categoría, así que se reparte con el TicketCategoryBalancer.
+    """
+    def __init__(self, bot, categories):
+        self.bot = bot
+        self.categories = categories
+        self.available = defaultdict(deque) # (guild_id, tipo) -> IDs de canales libres
+        self.refilling = {} # (guild_id, tipo) -> tarea de relleno en curso
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    async def load(self):
+        if self.bot.db is None:
+            return
+        try:
+            await self.bot.db.ticket_pool.create_index([("guild_id", ASCENDING), ("type", ASCENDING)])
+            async for doc in self.bot.db.ticket_pool.find({}):
+                self.available[(doc["guild_id"], doc["type"])].append(doc["_id"])
+        except Exception as e:
+            # Sin el pool los tickets se abren creando el canal; no debe impedir que cargue el cog
+            print(f"ERROR al cargar el pool de canales de tickets: {e}")
+
+    def is_pool_channel(self, channel_id):
+        return any(channel_id in channel_ids for channel_ids in self.available.values())
+
+    async def discard(self, channel_id):
+        for channel_ids in self.available.values():
+            if channel_id in channel_ids:
+                channel_ids.remove(channel_id)
+        if self.bot.db is not None:
+            await self.bot.db.ticket_pool.delete_one({"_id": channel_id})
+
+    async def acquire(self, guild, ticket_type, category_ids):
+        """Saca un canal libre del pool para `ticket_type` dentro de una de `category_ids`, o None si no hay."""
+        key = (guild.id, ticket_type)
+        channel_ids = self.available.get(key)
+        while channel_ids:
+            channel_id = channel_ids.popleft()
+            if self.bot.db is not None:
+                await self.bot.db.ticket_pool.delete_one({"_id": channel_id})
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                continue # El canal se eliminó manualmente
+            if channel.category_id not in category_ids:
+                # La categoría del tipo cambió: el canal ya no sirve
+                try:
+                    await channel.delete(reason="Canal del pool de tickets obsoleto")
+                except discord.HTTPException:
+                    pass
+                continue
+            self.hits[key] += 1
+            return channel
+        self.misses[key] += 1
+        return None
+
+    def refill(self, guild, ticket_type, category, size):
+        """Rellena el pool en segundo plano (una sola tarea por tipo de ticket). `category` es la configurada del tipo."""
+        key = (guild.id, ticket_type)
+        task = self.refilling.get(key)
+        if task and not task.done():
+            return
+        self.refilling[key] = asyncio.create_task(self._refill(guild, ticket_type, category, size))
+
+    async def _refill(self, guild, ticket_type, category, size):
+        key = (guild.id, ticket_type)
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True, embed_links=True, manage_channels=True)
+        }
+        try:
+            while len(self.available[key]) < size:
+                # Igual que un ticket normal: la categoría menos llena del tipo, con desbordamiento si todas están llenas
+                target_category = await self.categories.pick(guild, ticket_type, category)
+                try:
+                    channel = await guild.create_text_channel(
+                        f"{POOL_CHANNEL_PREFIX}{uuid.uuid4().hex[:8]}",
+                        category=target_category,
+                        overwrites=overwrites,
+                        reason=f"Pool de tickets '{ticket_type}'"
+                    )
+                finally:
+                    self.categories.release(target_category)
+                self.available[key].append(channel.id)
+                if self.bot.db is not None:
+                    await self.bot.db.ticket_pool.insert_one({
+                        "_id": channel.id,
+                        "guild_id": guild.id,
+                        "type": ticket_type,
+                        "category_id": target_category.id,
+                        "created_at": discord.utils.utcnow()
+                    })
+        except discord.Forbidden:
+            print(f"ERROR: Sin permisos para crear canales del pool de tickets '{ticket_type}' en '{guild.name}'.")
+        except Exception as e:
+            print(f"ERROR al rellenar el pool de tickets '{ticket_type}' en '{guild.name}': {e}")
+
+    async def shrink(self, guild, ticket_type, size):
+        """Elimina los canales sobrantes cuando se reduce el tamaño del pool."""
+        channel_ids = self.available.get((guild.id, ticket_type))
+        while channel_ids and len(channel_ids) > size:
+            channel_id = channel_ids.pop()
+            if self.bot.db is not None:
+                await self.bot.db.ticket_pool.delete_one({"_id": channel_id})
+            channel = guild.get_channel(channel_id)
+            if channel:
+                try:
+                    await channel.delete(reason="Pool de tickets reducido")
+                except discord.HTTPException:
+                    pass
+
+    def stats(self, guild_id):
+        keys = {key for key in list(self.available) + list(self.hits) + list(self.misses) if key[0] == guild_id}
+        return {
+            key[1]: {"available": len(self.available.get(key, ())), "hits": self.hits[key], "misses": self.misses[key]}
+            for key in sorted(keys)
+        }
+
+    def stop(self):
+        for task in self.refilling.values():
+            task.cancel()
+
+
+# --- Cola de admisión de aperturas de tickets ---
+class TicketAdmissionQueue:
+    """
+    Limita por servidor cuántos tickets se abren a la vez y agrupa las peticiones repetidas.
+    Cada (servidor, usuario) tiene como mucho una apertura en curso: los clics repetidos esperan
+    a esa misma apertura en lugar de crear otro canal. Los usuarios en cola reciben su posición.
+    """
+    def __init__(self, cog):
+        self.cog = cog
+        self.semaphores = {} # guild_id -> asyncio.Semaphore
+        self.waiting = defaultdict(int) # guild_id -> peticiones esperando turno
+        self.in_flight = {} # (guild_id, user_id) -> asyncio.Future con el canal creado
+
+    async def submit(self, interaction, ticket_type_name, ticket_type_config):
+        """Abre el ticket a través de la cola y devuelve el canal creado (o None)."""
+        key = (interaction.guild_id, interaction.user.id)
+        pending = self.in_flight.get(key)
+        if pending:
+            await interaction.followup.send("⏳ Ya estamos abriendo tu ticket. Te enviaremos el enlace en cuanto esté listo.", ephemeral=True)
+            ticket_channel = await asyncio.shield(pending)
+            if ticket_channel:
+                await interaction.followup.send(f"✅ Tu ticket está listo: {ticket_channel.mention}", ephemeral=True)
+            return ticket_channel
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            ticket_channel = await self._admit(interaction, ticket_type_name, ticket_type_config)
+            future.set_result(ticket_channel)
+            return ticket_channel
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            del self.in_flight[key]
+
+    async def _admit(self, interaction, ticket_type_name, ticket_type_config):
+        guild_id = interaction.guild_id
+        semaphore = self.semaphores.get(guild_id)
+        if semaphore is None:
+            semaphore = self.semaphores[guild_id] = asyncio.Semaphore(TICKET_OPEN_CONCURRENCY)
+
+        queue_message = None
+        if semaphore.locked():
+            self.waiting[guild_id] += 1
+            position = self.waiting[guild_id]
+            try:
+                queue_message = await interaction.followup.send(
+                    f"⏳ Hay mucha demanda ahora mismo. Estás en la posición **{position}** de la cola; tu ticket se abrirá en breve.",
+                    ephemeral=True, wait=True
+                )
+            except discord.HTTPException:
+                pass
+            try:
+                await semaphore.acquire()
+            finally:
+                self.waiting[guild_id] -= 1
+        else:
+            await semaphore.acquire()
+
+        try:
+            if queue_message:
+                try:
+                    await queue_message.edit(content="⏳ ¡Es tu turno! Abriendo tu ticket...")
+                except discord.HTTPException:
+                    pass
+            return await self.cog.create_ticket_channel(interaction, ticket_type_name, ticket_type_config)
+        finally:
+            semaphore.release()
+
+
+# --- Estadísticas de tickets ---
+class TicketAnalytics:
+    """
+    Guarda los eventos del ciclo de vida de los tickets (colección `ticket_events`) y mantiene
+    resúmenes incrementales en `ticket_rollups`, uno por (servidor, día, staff, tipo de ticket).
+    Cada evento es un `$inc` sobre su resumen, así que /ticketstats lee como mucho unos cientos
+    de documentos por un índice en lugar de agregar todo el historial.
+    """
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def setup(self):
+        if self.bot.db is None:
+            return
+        try:
+            await self.bot.db.ticket_events.create_index([("guild_id", ASCENDING), ("at", ASCENDING)])
+            await self.bot.db.ticket_events.create_index([("channel_id", ASCENDING)])
+            await self.bot.db.ticket_rollups.create_index(
+                [("guild_id", ASCENDING), ("day", ASCENDING), ("staff_id", ASCENDING), ("ticket_type", ASCENDING)],
+                unique=True
+            )
+        except Exception as e:
+            print(f"ERROR al crear los índices de estadísticas de tickets: {e}")
+
+    @staticmethod
+    def claim_bucket(seconds):
+        for limit in CLAIM_TIME_BUCKETS:
+            if seconds <= limit:
+                return str(limit)
+        return "inf"
+
+    async def record(self, event, ticket, actor_id=None, staff_id=None, at=None, **data):
+        """
+        Registra `event` ("open", "claim", "close" o "rating") del ticket y actualiza su resumen diario.
+        `staff_id` es el miembro del staff al que se atribuye el evento (None para la apertura).
+        """
+        if self.bot.db is None or ticket is None:
+            return
+        at = at or discord.utils.utcnow()
+        ticket_type = ticket.get("type") or "desconocido"
+
+        increments = {}
+        if event == "open":
+            increments["opened"] = 1
+        elif event == "claim":
+            increments["claimed"] = 1
+            claim_seconds = data.get("claim_seconds")
+            if claim_seconds is not None:
+                increments["claim_seconds_sum"] = claim_seconds
+                increments[f"claim_time_buckets.{self.claim_bucket(claim_seconds)}"] = 1
+        elif event == "close":
+            increments["closed"] = 1
+        elif event == "rating":
+            increments["ratings_count"] = 1
+            increments["ratings_sum"] = data["rating"]
+            increments[f"rating_counts.{data['rating']}"] = 1
+
+        try:
+            await self.bot.db.ticket_events.insert_one({
+                "guild_id": ticket["guild_id"],
+                "channel_id": ticket["_id"],
+                "ticket_type": ticket_type,
+                "event": event,
+                "actor_id": actor_id,
+                "staff_id": staff_id,
+                "at": at,
+                "data": data
+            })
+            await self.bot.db.ticket_rollups.update_one(
+                {"guild_id": ticket["guild_id"], "day": at.strftime("%Y-%m-%d"), "staff_id": staff_id, "ticket_type": ticket_type},
+                {"$inc": increments},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"ERROR al registrar el evento '{event}' del ticket {ticket['_id']}: {e}")
+
+    async def summary(self, guild_id, days, staff_id=None):
+        """Suma los resúmenes de los últimos `days` días (opcionalmente de un solo miembro del staff)."""
+        since = (discord.utils.utcnow() - datetime.timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        query = {"guild_id": guild_id, "day": {"$gte": since}}
+        if staff_id is not None:
+            query["staff_id"] = staff_id
+
+        totals = defaultdict(int)
+        claim_buckets = defaultdict(int)
+        by_staff = defaultdict(lambda: defaultdict(int))
+        by_type = defaultdict(int)
+        async for rollup in self.bot.db.ticket_rollups.find(query):
+            for field in ("opened", "claimed", "closed", "ratings_count", "ratings_sum", "claim_seconds_sum"):
+                totals[field] += rollup.get(field, 0)
+            for bucket, count in rollup.get("claim_time_buckets", {}).items():
+                claim_buckets[bucket] += count
+            by_type[rollup["ticket_type"]] += rollup.get("opened", 0)
+            if rollup.get("staff_id") is not None:
+                staff_totals = by_staff[rollup["staff_id"]]
+                for field in ("claimed", "closed", "ratings_count", "ratings_sum"):
+                    staff_totals[field] += rollup.get(field, 0)
+
+        return {
+            "totals": totals,
+            "median_claim_seconds": self.histogram_median(claim_buckets),
+            "by_staff": by_staff,
+            "by_type": by_type
+        }
+
+    @staticmethod
+    def histogram_median(buckets):
+        """Mediana aproximada (límite superior del bucket que contiene la mitad de las muestras)."""
+        total = sum(buckets.values())
+        if not total:
+            return None
+        seen = 0
+        for limit in [str(limit) for limit in CLAIM_TIME_BUCKETS] + ["inf"]:
+            seen += buckets.get(limit, 0)
+            if seen * 2 >= total:
+                return None if limit == "inf" else int(limit)
+        return None
+
+
+# --- Categorías de desbordamiento por tipo de ticket ---
+class TicketCategoryBalancer:
+    """
+    Reparte los tickets de cada tipo entre su categoría configurada y categorías de desbordamiento
+    (guardadas en `ticket_overflow_categories.<tipo>` de la configuración). El número de canales de
+    cada categoría se cachea y se mantiene con los eventos de creación, borrado y movimiento de canales.
+    Cuando todas están llenas se crea otra categoría, y las de desbordamiento vacías se eliminan.
+    """
+    def __init__(self, cog):
+        self.cog = cog
+        self.counts = {} # category_id -> canales en la categoría
+        self.reserved = defaultdict(int) # category_id -> canales en creación
+        self.overflow = {} # category_id de desbordamiento -> (guild_id, tipo)
+        self.locks = defaultdict(asyncio.Lock) # (guild_id, tipo) -> lock para no crear categorías duplicadas
+
+    def count(self, category):
+        if category.id not in self.counts:
+            self.counts[category.id] = len(category.channels)
+        return self.counts[category.id] + self.reserved[category.id]
+
+    async def category_ids(self, guild_id, ticket_type, base_category):
+        settings = await self.cog.get_ticket_settings(guild_id)
+        overflow_ids = settings.get("ticket_overflow_categories", {}).get(ticket_type, [])
+        for category_id in overflow_ids:
+            self.overflow[category_id] = (guild_id, ticket_type)
+        return [base_category.id] + [category_id for category_id in overflow_ids if category_id != base_category.id]
+
+    async def pick(self, guild, ticket_type, base_category):
+        """Devuelve la categoría menos llena del tipo y reserva un hueco (liberar con `release`)."""
+        async with self.locks[(guild.id, ticket_type)]:
+            categories = [
+                category for category in (guild.get_channel(category_id) for category_id in await self.category_ids(guild.id, ticket_type, base_category))
+                if isinstance(category, discord.CategoryChannel)
+            ]
+            best = min(categories, key=self.count) # En empate gana la primera (la categoría configurada)
+            if self.count(best) >= CATEGORY_CHANNEL_LIMIT:
+                best = await self._create_overflow(guild, ticket_type, base_category, len(categories))
+
+            for category in categories:
+                if category.id in self.overflow and category.id != best.id and self.count(category) == 0:
+                    await self._remove_overflow(guild, category)
+
+            self.reserved[best.id] += 1
+            return best
+
+    def release(self, category):
+        self.reserved[category.id] -= 1
+        if self.reserved[category.id] <= 0:
+            del self.reserved[category.id]
+
+    async def _create_overflow(self, guild, ticket_type, base_category, existing):
+        category = await guild.create_category(
+            f"{base_category.name} ({existing + 1})"[:100],
+            overwrites=base_category.overwrites,
+            position=base_category.position + existing,
+            reason=f"Categoría de desbordamiento para tickets '{ticket_type}'"
+        )
+        self.counts[category.id] = 0
+        self.overflow[category.id] = (guild.id, ticket_type)
+        await self.cog.update_ticket_settings(guild.id, {"$addToSet": {f"ticket_overflow_categories.{ticket_type}": category.id}}, upsert=True)
+        print(f"Categoría de desbordamiento '{category.name}' creada para tickets '{ticket_type}' en '{guild.name}'.")
+        return category
+
+    async def _remove_overflow(self, guild, category):
+        if category.channels or self.reserved.get(category.id):
+            return
+        _, ticket_type = self.overflow.pop(category.id)
+        self.counts.pop(category.id, None)
+        await self.cog.update_ticket_settings(guild.id, {"$pull": {f"ticket_overflow_categories.{ticket_type}": category.id}})
+        try:
+            await category.delete(reason=f"Categoría de desbordamiento de tickets '{ticket_type}' vacía")
+        except discord.HTTPException as e:
+            print(f"ERROR al eliminar la categoría de desbordamiento {category.name} ({category.id}): {e}")
+
+    def on_channel_create(self, channel):
+        if channel.category_id in self.counts:
+            self.counts[channel.category_id] += 1
+
+    async def on_channel_delete(self, channel):
+        if isinstance(channel, discord.CategoryChannel):
+            self.counts.pop(channel.id, None)
+            if channel.id in self.overflow:
+                _, ticket_type = self.overflow.pop(channel.id)
+                await self.cog.update_ticket_settings(channel.guild.id, {"$pull": {f"ticket_overflow_categories.{ticket_type}": channel.id}})
+            return
+        if channel.category_id in self.counts:
+            self.counts[channel.category_id] -= 1
+            if channel.category_id in self.overflow and self.counts[channel.category_id] <= 0:
+                guild_id, ticket_type = self.overflow[channel.category_id]
+                async with self.locks[(guild_id, ticket_type)]:
+                    category = channel.guild.get_channel(channel.category_id)
+                    if category and channel.category_id in self.overflow:
+                        await self._remove_overflow(channel.guild, category)
+
+    def on_channel_update(self, before, after):
+        if before.category_id == after.category_id:
+            return
+        if before.category_id in self.counts:
+            self.counts[before.category_id] -= 1
+        if after.category_id in self.counts:
+            self.counts[after.category_id] += 1
+
 
 class Tickets(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.registry = TicketRegistry(bot)
+        # Un único temporizador para todos los tickets en cierre. Cada ticket tiene como mucho un plazo
+        # (`deadline` en su documento): el fin del tiempo de valoración o el momento de eliminar el canal.
+        self.deadlines = DeadlineScheduler(bot, self.on_ticket_deadline, "tickets")
+        self.transcripts = TicketTranscriptExporter(bot)
+        self.categories = TicketCategoryBalancer(self)
+        self.pool = TicketChannelPool(bot, self.categories)
+        self.admission = TicketAdmissionQueue(self)
+        self.settings_cache = {} # guild_id -> configuración de tickets
+        self.delete_attempts = {} # channel_id -> intentos fallidos de eliminar el canal
+        self.analytics = TicketAnalytics(bot)
         # Persistir las vistas
-        # Para TicketPanel, la configuración ticket_types_config se cargará dinámicamente en on_ready o cuando se envía el panel
-        # Por ahora, pasamos un diccionario vacío al registrar la vista.
+        # TicketPanel se registra sin opciones: el select resuelve la configuración del servidor al hacer clic.
         self.bot.add_view(TicketPanel(self.bot, {})) 
         self.bot.add_view(ClaimTicketButton(self.bot))
-        # Para TicketRatingViewInChannel, ticket_creator_id y original_guild_id se pasarán dinámicamente.
-        # Aquí pasamos 0 para los IDs al registrar la vista.
-        self.bot.add_view(TicketRatingViewInChannel(self.bot, 0, 0))
+        # La vista de valoración no guarda estado: el creador y el estado del cierre se leen del registro.
+        self.bot.add_view(TicketRatingViewInChannel(self.bot))
+
+    async def cog_load(self):
+        await self.registry.load()
+        # Reprogramar los plazos de los tickets que estaban cerrándose antes del reinicio
+        for ticket in list(self.registry.by_channel.values()):
+            if ticket.get("deadline") and ticket.get("status") != "open":
+                self.deadlines.schedule(ticket["_id"], ticket["deadline"])
+        await self.pool.load()
+        await self.analytics.setup()
+        self.deadlines.start()
+        self.pool_warmup_task = asyncio.create_task(self.warm_ticket_pools())
+        self.legacy_backfill_task = asyncio.create_task(self.backfill_legacy_tickets())
+        self.flush_ticket_activity.start()
+        self.sweep_inactive_tickets.start()
+
+    async def cog_unload(self):
+        self.deadlines.stop()
+        self.pool_warmup_task.cancel()
+        self.legacy_backfill_task.cancel()
+        self.pool.stop()
+        self.flush_ticket_activity.cancel()
+        self.sweep_inactive_tickets.cancel()
+        await self.registry.flush_activity()
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        # Solo cuenta la actividad de personas: los avisos del propio bot no reinician el contador
+        if message.author.bot or message.guild is None:
+            return
+        self.registry.touch(message.channel.id, message.created_at)
+
+    @tasks.loop(seconds=TICKET_ACTIVITY_FLUSH_SECONDS)
+    async def flush_ticket_activity(self):
+        await self.registry.flush_activity()
+
+    @tasks.loop(minutes=TICKET_SWEEP_INTERVAL_MINUTES)
+    async def sweep_inactive_tickets(self):
+        """Avisa y luego cierra los tickets abandonados, en lotes acotados."""
+        await self.registry.flush_activity() # No cerrar tickets con actividad aún sin guardar
+        now = discord.utils.utcnow()
+
+        # 1. Cerrar los tickets avisados que siguen sin actividad tras el margen
+        close_since = now - datetime.timedelta(seconds=TICKET_INACTIVITY_WARNING_SECONDS + TICKET_INACTIVITY_CLOSE_SECONDS)
+        grace_since = now - datetime.timedelta(seconds=TICKET_INACTIVITY_CLOSE_SECONDS)
+        for ticket in await self.registry.find_inactive(close_since, warned=True, limit=TICKET_SWEEP_BATCH_SIZE):
+            warned_at = ticket.get("inactivity_warned_at")
+            if warned_at is None or as_utc(warned_at) > grace_since:
+                continue # El aviso es reciente (p. ej. el bot estuvo caído): respetar el margen completo
+            ticket_channel = self.bot.get_channel(ticket["_id"])
+            if ticket_channel is None:
+                await self.registry.mark_deleted(ticket["_id"])
+                continue
+            try:
+                await self.handle_ticket_close_final(ticket_channel, ticket_channel.guild.me, reason="Cerrado automáticamente por inactividad.")
+            except Exception as e:
+                print(f"ERROR al cerrar por inactividad el ticket {ticket_channel.name} ({ticket_channel.id}): {e}")
+            finally:
+                await self.ensure_ticket_deletion(ticket_channel)
+
+        # 2. Avisar a los tickets que acaban de superar el umbral de inactividad
+        warn_since = now - datetime.timedelta(seconds=TICKET_INACTIVITY_WARNING_SECONDS)
+        for ticket in await self.registry.find_inactive(warn_since, warned=False, limit=TICKET_SWEEP_BATCH_SIZE):
+            ticket_channel = self.bot.get_channel(ticket["_id"])
+            if ticket_channel is None:
+                await self.registry.mark_deleted(ticket["_id"])
+                continue
+            try:
+                await ticket_channel.send(
+                    f"⏰ <@{ticket['creator_id']}>, este ticket lleva {TICKET_INACTIVITY_WARNING_SECONDS // 3600} horas sin actividad. "
+                    f"Se cerrará automáticamente si no hay nuevos mensajes en las próximas {TICKET_INACTIVITY_CLOSE_SECONDS // 3600} horas."
+                )
+            except discord.HTTPException as e:
+                print(f"ERROR al avisar de inactividad en el ticket {ticket_channel.name} ({ticket_channel.id}): {e}")
+            await self.registry.update(ticket["_id"], inactivity_warned_at=now)
+
+    @sweep_inactive_tickets.before_loop
+    async def before_sweep_inactive_tickets(self):
+        await self.bot.wait_until_ready()
+
+    # --- Tickets abiertos antes del registro ---
+    def legacy_ticket_categories(self, guild, settings):
+        """Categorías donde pueden quedar tickets antiguos (las configuradas y las del nombre por defecto)."""
+        category_ids = {settings.get("ticket_category_id")}
+        category_ids.update(config.get("category_id") for config in settings.get("ticket_types", {}).values())
+        for overflow_ids in settings.get("ticket_overflow_categories", {}).values():
+            category_ids.update(overflow_ids)
+        return [
+            category for category in guild.categories
+            if category.id in category_ids or category.name.lower().startswith(DEFAULT_TICKET_CATEGORY_NAME.lower())
+        ]
 
+    def is_legacy_ticket_channel(self, channel):
+        return (
+            isinstance(channel, discord.TextChannel)
+            and channel.name.startswith(DEFAULT_TICKET_CHANNEL_PREFIX)
+            and not channel.name.startswith(POOL_CHANNEL_PREFIX)
+            and channel.id not in self.registry.by_channel
+            and not self.pool.is_pool_channel(channel.id)
+        )
+
+    def legacy_ticket_creator(self, channel):
+        """El creador de un ticket antiguo es el miembro con permiso de lectura en los overwrites del canal."""
+        for target, overwrite in channel.overwrites.items():
+            is_member = isinstance(target, discord.Member) or (isinstance(target, discord.Object) and target.type is discord.Member)
+            if is_member and target.id != self.bot.user.id and not getattr(target, "bot", False) and overwrite.read_messages:
+                return target.id
+        # Nombre antiguo: ticket-<nombre>-<id del usuario>
+        suffix = channel.name.rsplit("-", 1)[-1]
+        return int(suffix) if suffix.isdigit() and len(suffix) >= 17 else None
+
+    async def adopt_legacy_ticket(self, channel, settings=None):
+        """Registra un canal ticket-* abierto antes del registro. Devuelve el documento, o None si no se reconoce."""
+        if not self.is_legacy_ticket_channel(channel):
+            return None
+        creator_id = self.legacy_ticket_creator(channel)
+        if creator_id is None:
+            print(f"ADVERTENCIA: No se pudo determinar el creador del ticket antiguo {channel.name} ({channel.id}).")
+            return None
+        settings = settings or await self.get_ticket_settings(channel.guild.id)
+        ticket_type = next(
+            (name for name, config in settings.get("ticket_types", {}).items() if config.get("category_id") == channel.category_id),
+            "desconocido"
+        )
+        return await self.registry.adopt(channel, creator_id, ticket_type)
+
+    async def backfill_legacy_tickets(self):
+        """
+        Migración única por servidor: registra los tickets abiertos antes de que existiera el registro,
+        para que /close, reclamar, la comprobación de duplicados y el barrido de inactividad los vean.
+        """
+        if self.bot.db is None:
+            return
+        await self.bot.wait_until_ready()
+        for guild in self.bot.guilds:
+            settings = await self.get_ticket_settings(guild.id)
+            if settings.get("legacy_tickets_backfilled"):
+                continue
+            adopted = 0
+            try:
+                for category in self.legacy_ticket_categories(guild, settings):
+                    for channel in category.text_channels:
+                        if await self.adopt_legacy_ticket(channel, settings):
+                            adopted += 1
+                await self.update_ticket_settings(guild.id, {"$set": {"legacy_tickets_backfilled": True}}, upsert=True)
+                if adopted:
+                    print(f"TicketRegistry: {adopted} tickets antiguos registrados en el servidor '{guild.name}'.")
+            except Exception as e:
+                print(f"ERROR al registrar los tickets antiguos del servidor '{guild.name}': {e}")
+
+    async def warm_ticket_pools(self):
+        """Rellena al arrancar los pools de todos los tipos de ticket que tengan uno configurado."""
+        if self.bot.db is None:
+            return
+        await self.bot.wait_until_ready()
+        async for settings in self.bot.db.ticket_settings.find({"ticket_pool_sizes": {"$exists": True}}):
+            guild = self.bot.get_guild(settings["_id"])
+            if guild is None:
+                continue
+            for ticket_type, size in settings["ticket_pool_sizes"].items():
+                config = settings.get("ticket_types", {}).get(ticket_type)
+                category_id = (config or {}).get("category_id") or settings.get("ticket_category_id")
+                category = guild.get_channel(category_id) if category_id else None
+                if config and category and size > 0:
+                    self.pool.refill(guild, ticket_type, category, size)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.categories.on_channel_create(channel)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.categories.on_channel_update(before, after)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        await self.categories.on_channel_delete(channel)
+        # Mantener el registro coherente si un ticket se borra a mano
+        if self.pool.is_pool_channel(channel.id):
+            await self.pool.discard(channel.id)
+        if channel.id in self.registry.by_channel:
+            self.deadlines.cancel(channel.id)
+            await self.registry.mark_deleted(channel.id)
 
     async def get_ticket_settings(self, guild_id):
-        """Obtiene la configuración de tickets para un servidor desde la base de datos."""
+        """Obtiene la configuración de tickets para un servidor (cacheada; se invalida al cambiarla)."""
+        settings = self.settings_cache.get(guild_id)
+        if settings is not None:
+            return settings
         if self.bot.db is None:
             print("Error: La base de datos no está conectada para obtener configuración de tickets.")
             return {}
@@ -292,16 +1275,24 @@ class Tickets(commands.Cog):
         if settings:
             if "ticket_types" not in settings:
                 settings["ticket_types"] = {}
-            return settings
-        return {
-            "ticket_category_id": None,
-            "ticket_log_channel_id": None,
-            "ticket_rating_log_channel_id": None,
-            "support_role_id": None,
-            "ticket_types": {} 
-        }
-
-    async def send_ticket_log(self, guild, embed_title, description, user, action_type, color, ticket_channel=None, closed_by=None, reason=None):
+        else:
+            settings = {
+                "ticket_category_id": None,
+                "ticket_log_channel_id": None,
+                "ticket_rating_log_channel_id": None,
+                "support_role_id": None,
+                "ticket_types": {} 
+            }
+        self.settings_cache[guild_id] = settings
+        return settings
+
+    async def update_ticket_settings(self, guild_id, update, upsert=False):
+        """Aplica `update` a la configuración del servidor e invalida la caché."""
+        result = await self.bot.db.ticket_settings.update_one({"_id": guild_id}, update, upsert=upsert)
+        self.settings_cache.pop(guild_id, None)
+        return result
+
+    async def send_ticket_log(self, guild, embed_title, description, user, action_type, color, ticket_channel=None, closed_by=None, reason=None, files=None):
         """Envía un log al canal de logs de tickets."""
         settings = await self.get_ticket_settings(guild.id)
         log_channel_id = settings.get("ticket_log_channel_id")
@@ -327,7 +1318,7 @@ class Tickets(commands.Cog):
             log_embed.timestamp = discord.utils.utcnow()
 
             try:
-                await log_channel.send(embed=log_embed)
+                await log_channel.send(embed=log_embed, files=files or [])
             except discord.Forbidden:
                 print(f"ERROR: El bot no tiene permisos para enviar logs en el canal de tickets {log_channel.name} ({log_channel.id}).")
             except Exception as e:
@@ -364,6 +1355,7 @@ class Tickets(commands.Cog):
             print(f"TICKET_RATING: {user.name} - {rating}/5 | Comentario: {comment} | Guild: {guild.name}")
 
     async def create_ticket_channel(self, interaction: discord.Interaction, ticket_type_name: str, ticket_type_config: dict):
+        """Crea el canal del ticket y devuelve el canal, o None si no se pudo abrir."""
         guild = interaction.guild
         user = interaction.user
 
@@ -380,15 +1372,13 @@ class Tickets(commands.Cog):
             await interaction.followup.send(f"❌ La categoría '{category_id}' configurada para '{ticket_type_name}' no existe. Por favor, pídale a un administrador que la reconfigure.", ephemeral=True)
             return
 
-        all_ticket_categories = [c for c in guild.categories if c.name.lower().startswith(DEFAULT_TICKET_CATEGORY_NAME.lower()) or c.id == category_id]
-        
-        user_ticket_channels = [
-            channel for cat in all_ticket_categories for channel in cat.channels 
-            if channel.name.startswith(DEFAULT_TICKET_CHANNEL_PREFIX) and user.id in [m.id for m in channel.members]
-        ]
-
-        if user_ticket_channels:
-            return await interaction.followup.send(f"⚠️ Ya tienes un ticket abierto en {user_ticket_channels[0].mention}. Por favor, ciérralo antes de abrir uno nuevo.", ephemeral=True)
+        existing_ticket_id = self.registry.find_open_ticket(guild.id, user.id)
+        if existing_ticket_id:
+            existing_ticket = guild.get_channel(existing_ticket_id)
+            if existing_ticket:
+                await interaction.followup.send(f"⚠️ Ya tienes un ticket abierto en {existing_ticket.mention}. Por favor, ciérralo antes de abrir uno nuevo.", ephemeral=True)
+                return None
+            await self.registry.mark_deleted(existing_ticket_id) # El canal ya no existe
 
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(read_messages=False),
@@ -411,12 +1401,33 @@ class Tickets(commands.Cog):
         ticket_channel_name = f"{DEFAULT_TICKET_CHANNEL_PREFIX}{user.name.replace(' ', '-').lower()}-{user.discriminator if hasattr(user, 'discriminator') else user.id}"[:100]
 
         try:
-            ticket_channel = await guild.create_text_channel(
-                ticket_channel_name,
-                category=category,
-                overwrites=overwrites,
-                reason=f"Ticket '{ticket_type_name}' abierto por {user.name}"
-            )
+            # Con pool configurado, basta con renombrar el canal y aplicar los permisos en una sola edición
+            pool_size = settings.get("ticket_pool_sizes", {}).get(ticket_type_name, 0)
+            category_ids = await self.categories.category_ids(guild.id, ticket_type_name, category)
+            ticket_channel = await self.pool.acquire(guild, ticket_type_name, category_ids) if pool_size else None
+            if ticket_channel:
+                await ticket_channel.edit(
+                    name=ticket_channel_name,
+                    overwrites=overwrites,
+                    reason=f"Ticket '{ticket_type_name}' abierto por {user.name}"
+                )
+            else:
+                # Si no, se crea en la categoría menos llena del tipo (con desbordamiento a partir de 50 canales)
+                target_category = await self.categories.pick(guild, ticket_type_name, category)
+                try:
+                    ticket_channel = await guild.create_text_channel(
+                        ticket_channel_name,
+                        category=target_category,
+                        overwrites=overwrites,
+                        reason=f"Ticket '{ticket_type_name}' abierto por {user.name}"
+                    )
+                finally:
+                    self.categories.release(target_category)
+            if pool_size:
+                # Reponer el pool en segundo plano
+                self.pool.refill(guild, ticket_type_name, category, pool_size)
+            ticket = await self.registry.register(ticket_channel, user.id, ticket_type_name)
+            await self.analytics.record("open", ticket, actor_id=user.id, at=ticket["opened_at"])
             await interaction.followup.send(f"✅ Tu ticket '{ticket_type_name}' ha sido creado: {ticket_channel.mention}", ephemeral=True)
 
             ticket_embed = discord.Embed(
@@ -441,6 +1452,7 @@ class Tickets(commands.Cog):
                 discord.Color.blue(),
                 ticket_channel
             )
+            return ticket_channel
 
         except discord.Forbidden:
             await interaction.followup.send("❌ No tengo los permisos para crear canales o configurar los permisos necesarios. Asegúrate de que mi rol tenga `Gestionar Canales` y esté por encima de los roles de los usuarios en la jerarquía.", ephemeral=True)
@@ -448,76 +1460,241 @@ class Tickets(commands.Cog):
             await interaction.followup.send(f"❌ Ocurrió un error al abrir el ticket: {e}", ephemeral=True)
             print(f"Error al abrir ticket: {e}")
 
-    # --- Flujo de Cierre de Ticket (Inicia la valoración) ---
+    # --- Flujo de Cierre de Ticket (máquina de estados) ---
+    # open -> closing: se envía la valoración y se programa su plazo. Ninguna corrutina queda esperando:
+    # los botones buscan el estado por canal y el programador de plazos se encarga de los tiempos.
     async def handle_ticket_close_initiate_rating(self, ticket_channel: discord.TextChannel, ticket_creator_id: int, closed_by: discord.Member):
-        guild = ticket_channel.guild
-        ticket_creator = guild.get_member(ticket_creator_id) or await self.bot.fetch_user(ticket_creator_id) 
-        
+        deadline = discord.utils.utcnow() + datetime.timedelta(seconds=RATING_TIMEOUT_SECONDS)
+        ticket = await self.registry.transition(
+            ticket_channel.id, ["open"], "closing",
+            deadline=deadline,
+            close_requested_by=closed_by.id
+        )
+        if ticket is None:
+            return False # Otro cierre ya está en curso
+        # El plazo se programa antes de enviar nada: aunque falle el envío, el ticket se cerrará al vencer
+        self.deadlines.schedule(ticket_channel.id, deadline)
+
         # Enviar mensaje de valoración en el canal del ticket
         rating_embed = discord.Embed(
             title="🌟 ¡Valora tu Experiencia con el Ticket!",
-            description=f"Hola {ticket_creator.mention if ticket_creator else 'creador del ticket'},\nPor favor, tómate un momento para calificar tu experiencia con este ticket.\n\n**¿Qué tan satisfecho estás con el soporte recibido?** (1 = Muy insatisfecho, 5 = Muy satisfecho)",
+            description=f"Hola {f'<@{ticket_creator_id}>' if ticket_creator_id else 'creador del ticket'},\nPor favor, tómate un momento para calificar tu experiencia con este ticket.\n\n**¿Qué tan satisfecho estás con el soporte recibido?** (1 = Muy insatisfecho, 5 = Muy satisfecho)",
             color=discord.Color.gold()
         )
         rating_embed.set_footer(text="Haz clic en un número para calificar, o 'Cancelar Valoración' si eres Staff.")
-        
-        # Pasar el ID del creador y el guild_id a la vista de valoración en el canal
-        rating_view = TicketRatingViewInChannel(self.bot, ticket_creator_id, guild.id)
-        
+
         try:
-            # Enviar la vista y esperar a que se complete la valoración
-            rating_message = await ticket_channel.send(embed=rating_embed, view=rating_view)
-            rating_view.message = rating_message # Guardar el mensaje para poder editarlo después
+            rating_message = await ticket_channel.send(embed=rating_embed, view=TicketRatingViewInChannel(self.bot))
+            await self.registry.update(ticket_channel.id, rating_message_id=rating_message.id)
+        except Exception as e:
+            print(f"Error al iniciar valoración en el canal: {e}")
+            try:
+                await ticket_channel.send(f"❌ Ocurrió un error al iniciar el proceso de valoración: {e}")
+            except discord.HTTPException:
+                pass # Si el primer envío fue Forbidden, este también fallará
+        return True
 
-            # Esperar a que la valoración se complete (o se cancele)
-            await rating_view.rated.wait()
+    async def disable_rating_message(self, ticket_channel, ticket, content):
+        rating_message_id = ticket.get("rating_message_id")
+        if not rating_message_id:
+            return
+        try:
+            await ticket_channel.get_partial_message(rating_message_id).edit(content=content, view=TicketRatingViewInChannel(self.bot, disabled=True))
+        except discord.HTTPException:
+            pass # El mensaje ya pudo haber sido eliminado
 
+    # closing -> rated
+    async def complete_rating(self, ticket_channel, user, rating, comment):
+        ticket = await self.registry.transition(ticket_channel.id, ["closing"], "rated", rating=rating, rating_comment=comment)
+        if ticket is None:
+            return False
+        self.deadlines.cancel(ticket_channel.id)
+
+        try:
+            await self.analytics.record("rating", ticket, actor_id=user.id, staff_id=ticket.get("claimed_by"), rating=rating)
+            # Log la calificación en el canal de logs de valoración
+            await self.log_ticket_rating(user, rating, comment, ticket_channel.id, ticket["creator_id"], ticket_channel.guild)
+            # Editar el mensaje de calificación en el canal para mostrar que ya se calificó
+            await self.disable_rating_message(ticket_channel, ticket, f"Gracias por calificar el ticket con **{rating}/5**. Comentario: '{comment}'")
+            # Cerrar el ticket después de la calificación
+            await self.handle_ticket_close_final(ticket_channel, user, reason=f"Cerrado después de valoración ({rating}/5)")
+        finally:
+            await self.ensure_ticket_deletion(ticket_channel)
+        return True
+
+    # closing -> cancelled (el staff cierra sin esperar la valoración)
+    async def cancel_rating(self, ticket_channel, staff_member):
+        ticket = await self.registry.transition(ticket_channel.id, ["closing"], "cancelled")
+        if ticket is None:
+            return False
+        self.deadlines.cancel(ticket_channel.id)
+        try:
+            await self.disable_rating_message(ticket_channel, ticket, "Valoración cancelada por el staff.")
+            await self.handle_ticket_close_final(ticket_channel, staff_member, reason="Valoración cancelada por el staff.")
+        finally:
+            await self.ensure_ticket_deletion(ticket_channel)
+        return True
+
+    async def ensure_ticket_deletion(self, ticket_channel):
+        """Programa la eliminación del canal si el cierre falló antes de hacerlo; un ticket sin plazo quedaría abandonado."""
+        if self.deadlines.is_scheduled(ticket_channel.id):
+            return
+        delete_at = discord.utils.utcnow() + datetime.timedelta(seconds=TICKET_DELETE_DELAY_SECONDS)
+        self.deadlines.schedule(ticket_channel.id, delete_at)
+        try:
+            await self.registry.update(ticket_channel.id, deadline=delete_at)
         except Exception as e:
-            print(f"Error al iniciar valoración en el canal: {e}")
-            await ticket_channel.send(f"❌ Ocurrió un error al iniciar el proceso de valoración: {e}")
-            # Si hay un error aquí, el ticket podría quedar abierto.
-            # Podríamos añadir una llamada a handle_ticket_close_final aquí también para asegurarnos el cierre.
+            print(f"ERROR al guardar el plazo de eliminación del ticket {ticket_channel.id}: {e}")
 
-    # --- Cierre Final del Ticket (Después de valoración o cancelación) ---
+    # Plazo vencido: closing -> expired, o eliminación del canal de un ticket ya cerrado
+    async def on_ticket_deadline(self, channel_id):
+        ticket = await self.registry.get(channel_id)
+        if ticket is None:
+            return
+        ticket_channel = self.bot.get_channel(channel_id)
+        if ticket_channel is None:
+            self.delete_attempts.pop(channel_id, None)
+            await self.registry.mark_deleted(channel_id)
+            return
+
+        if ticket["status"] == "closing":
+            ticket = await self.registry.transition(channel_id, ["closing"], "expired")
+            if ticket is None:
+                return
+            try:
+                await self.disable_rating_message(ticket_channel, ticket, "El tiempo para calificar ha expirado. El ticket se cerrará sin valoración.")
+                await self.handle_ticket_close_final(ticket_channel, ticket_channel.guild.me, reason="Tiempo de valoración agotado.")
+            finally:
+                await self.ensure_ticket_deletion(ticket_channel)
+        elif ticket["status"] in CLOSING_TICKET_STATUSES:
+            await self.delete_ticket_channel(ticket_channel, ticket)
+
+    # --- Cierre Final del Ticket (Después de valoración, cancelación o plazo) ---
     async def handle_ticket_close_final(self, ticket_channel: discord.TextChannel, closed_by: discord.Member, reason: str):
         guild = ticket_channel.guild
         
-        # Intentar obtener el ID del creador del nombre del canal para el log
-        ticket_creator_id = None
-        try:
-            parts = ticket_channel.name.split('-')
-            if len(parts) > 1 and parts[-1].isdigit():
-                ticket_creator_id = int(parts[-1])
-        except ValueError:
-            pass
+        ticket = await self.registry.get(ticket_channel.id)
+        ticket_creator_id = ticket["creator_id"] if ticket else None
         ticket_creator = guild.get_member(ticket_creator_id) if ticket_creator_id else None
 
-        await ticket_channel.send("El ticket se cerrará en 5 segundos...")
-        await asyncio.sleep(5)
-
-        await self.send_ticket_log(
-            guild,
-            "✅ Ticket Cerrado",
-            f"El ticket {ticket_channel.name} ha sido cerrado.",
-            ticket_creator if ticket_creator else closed_by, 
-            "Cierre",
-            discord.Color.green(),
-            ticket_channel,
-            closed_by,
-            reason
-        )
+        # Un cierre directo (sin pasar por la valoración) deja el ticket en "closed"
+        delete_at = discord.utils.utcnow() + datetime.timedelta(seconds=TICKET_DELETE_DELAY_SECONDS)
+        close_fields = {"deadline": delete_at, "closed_at": discord.utils.utcnow(), "closed_by": closed_by.id, "close_reason": reason}
+        if ticket and ticket.get("status") in ("open", "closing"):
+            await self.registry.transition(ticket_channel.id, ["open", "closing"], "closed", **close_fields)
+        else:
+            await self.registry.update(ticket_channel.id, **close_fields)
+        await self.analytics.record("close", ticket, actor_id=closed_by.id, staff_id=ticket.get("claimed_by") if ticket else None, reason=reason)
+
+        # Exportar la transcripción antes de que el canal desaparezca
+        transcript = await self.export_ticket_transcript(ticket_channel)
+        log_files = []
+        if transcript:
+            log_files = [
+                discord.File(file_info["path"], filename=file_info["name"])
+                for file_info in transcript["files"]
+                if file_info["size"] <= guild.filesize_limit
+            ]
 
         try:
-            await ticket_channel.delete(reason=f"Ticket cerrado por {closed_by.name}: {reason}")
+            await self.send_ticket_log(
+                guild,
+                "✅ Ticket Cerrado",
+                f"El ticket {ticket_channel.name} ha sido cerrado."
+                + (f" Transcripción: {transcript['message_count']} mensajes." if transcript else ""),
+                ticket_creator if ticket_creator else closed_by, 
+                "Cierre",
+                discord.Color.green(),
+                ticket_channel,
+                closed_by,
+                reason,
+                files=log_files
+            )
+        finally:
+            # discord.py solo cierra los adjuntos si llega a enviarlos: sin canal de logs o con un error quedarían abiertos
+            for log_file in log_files:
+                log_file.close()
+            if transcript:
+                await self.transcripts.cleanup(transcript)
+
+        await ticket_channel.send(f"El ticket se cerrará en {TICKET_DELETE_DELAY_SECONDS} segundos...")
+
+        # La eliminación la hace el programador de plazos: no se deja una corrutina durmiendo.
+        # El plazo se cuenta desde que termina la exportación, que puede tardar en tickets largos.
+        delete_at = discord.utils.utcnow() + datetime.timedelta(seconds=TICKET_DELETE_DELAY_SECONDS)
+        await self.registry.update(ticket_channel.id, deadline=delete_at)
+        self.deadlines.schedule(ticket_channel.id, delete_at)
+
+    async def export_ticket_transcript(self, ticket_channel):
+        """Exporta la transcripción del ticket y guarda su tamaño y número de mensajes en el documento del ticket."""
+        settings = await self.get_ticket_settings(ticket_channel.guild.id)
+        try:
+            transcript = await self.transcripts.export(
+                ticket_channel,
+                include_html=settings.get("transcript_html", False),
+                storage=settings.get("transcript_storage", "disk")
+            )
+        except Exception as e:
+            print(f"ERROR al exportar la transcripción del ticket {ticket_channel.name} ({ticket_channel.id}): {e}")
+            return None
+
+        await self.registry.update(ticket_channel.id, transcript={
+            "message_count": transcript["message_count"],
+            "storage": transcript["storage"],
+            "size": sum(file_info["size"] for file_info in transcript["files"]),
+            "files": [
+                {
+                    "name": file_info["name"],
+                    "size": file_info["size"],
+                    "path": file_info["path"] if transcript["storage"] == "disk" else None,
+                    "gridfs_id": file_info["gridfs_id"]
+                }
+                for file_info in transcript["files"]
+            ],
+            "exported_at": discord.utils.utcnow()
+        })
+        return transcript
+
+    # rated / expired / cancelled / closed -> deleted
+    async def delete_ticket_channel(self, ticket_channel, ticket):
+        closed_by_id = ticket.get("closed_by")
+        if not ticket.get("transcript"):
+            # El bot se reinició durante la exportación: exportar antes de borrar el historial
+            transcript = await self.export_ticket_transcript(ticket_channel)
+            if transcript:
+                await self.transcripts.cleanup(transcript)
+        try:
+            await ticket_channel.delete(reason=f"Ticket cerrado por {closed_by_id}: {ticket.get('close_reason', 'Sin razón')}")
             print(f"Canal de ticket {ticket_channel.name} ({ticket_channel.id}) eliminado.")
+        except discord.NotFound:
+            pass # El canal ya no existe
         except discord.Forbidden:
             print("❌ No tengo los permisos para eliminar canales. Asegúrate de que mi rol tenga `Gestionar Canales` y esté por encima de la categoría de tickets.")
-            try:
-                await ticket_channel.send("❌ No pude eliminar este canal debido a falta de permisos.")
-            except:
-                pass
+            if not self.delete_attempts.get(ticket_channel.id):
+                try:
+                    await ticket_channel.send("❌ No pude eliminar este canal debido a falta de permisos.")
+                except:
+                    pass
+            if self.retry_ticket_deletion(ticket_channel):
+                return
         except Exception as e:
             print(f"❌ Ocurrió un error al cerrar el ticket (final): {e}")
+            if self.retry_ticket_deletion(ticket_channel):
+                return
+        self.delete_attempts.pop(ticket_channel.id, None)
+        # Eliminado, o sin más reintentos: el ticket deja de bloquear al creador
+        await self.registry.mark_deleted(ticket_channel.id)
+
+    def retry_ticket_deletion(self, ticket_channel):
+        """Reprograma la eliminación con espera exponencial. Devuelve False si ya no quedan reintentos."""
+        attempts = self.delete_attempts.get(ticket_channel.id, 0) + 1
+        if attempts > TICKET_DELETE_MAX_RETRIES:
+            print(f"ADVERTENCIA: Se abandona la eliminación del canal de ticket {ticket_channel.name} ({ticket_channel.id}) tras {TICKET_DELETE_MAX_RETRIES} reintentos.")
+            return False
+        self.delete_attempts[ticket_channel.id] = attempts
+        delay = TICKET_DELETE_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        self.deadlines.schedule(ticket_channel.id, discord.utils.utcnow() + datetime.timedelta(seconds=delay))
+        return True
 
 
     # --- Comandos de Configuración de Tickets (Slash Commands) ---
@@ -531,8 +1708,8 @@ class Tickets(commands.Cog):
             return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
 
         try:
-            await self.bot.db.ticket_settings.update_one(
-                {"_id": interaction.guild_id},
+            await self.update_ticket_settings(
+                interaction.guild_id,
                 {"$set": {"ticket_category_id": category.id}},
                 upsert=True
             )
@@ -551,8 +1728,8 @@ class Tickets(commands.Cog):
             return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
 
         try:
-            await self.bot.db.ticket_settings.update_one(
-                {"_id": interaction.guild_id},
+            await self.update_ticket_settings(
+                interaction.guild_id,
                 {"$set": {"ticket_log_channel_id": channel.id}},
                 upsert=True
             )
@@ -571,8 +1748,8 @@ class Tickets(commands.Cog):
             return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
 
         try:
-            await self.bot.db.ticket_settings.update_one(
-                {"_id": interaction.guild_id},
+            await self.update_ticket_settings(
+                interaction.guild_id,
                 {"$set": {"ticket_rating_log_channel_id": channel.id}},
                 upsert=True
             )
@@ -591,8 +1768,8 @@ class Tickets(commands.Cog):
             return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
 
         try:
-            await self.bot.db.ticket_settings.update_one(
-                {"_id": interaction.guild_id},
+            await self.update_ticket_settings(
+                interaction.guild_id,
                 {"$set": {"support_role_id": role.id}},
                 upsert=True
             )
@@ -602,6 +1779,30 @@ class Tickets(commands.Cog):
             await interaction.followup.send(f"❌ Ocurrió un error al configurar el rol de soporte: {e}", ephemeral=True)
             print(f"Error al configurar el rol de soporte: {e}")
             
+    @app_commands.command(name="settranscripts", description="Configura cómo se guardan las transcripciones de los tickets cerrados.")
+    @app_commands.describe(storage="Dónde guardar las transcripciones.", include_html="Generar también una versión HTML legible.")
+    @app_commands.choices(storage=[
+        app_commands.Choice(name="Disco", value="disk"),
+        app_commands.Choice(name="Base de datos (GridFS)", value="gridfs")
+    ])
+    @app_commands.default_permissions(manage_channels=True)
+    async def set_transcripts_slash(self, interaction: discord.Interaction, storage: app_commands.Choice[str], include_html: bool = False):
+        await interaction.response.defer(ephemeral=True)
+        if self.bot.db is None:
+            return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
+
+        try:
+            await self.update_ticket_settings(
+                interaction.guild_id,
+                {"$set": {"transcript_storage": storage.value, "transcript_html": include_html}},
+                upsert=True
+            )
+            await interaction.followup.send(f"✅ Las transcripciones se guardarán en **{storage.name}**{' con versión HTML' if include_html else ''}.", ephemeral=True)
+            print(f"Transcripciones configuradas ({storage.value}, html={include_html}) para el servidor '{interaction.guild.name}'.")
+        except Exception as e:
+            await interaction.followup.send(f"❌ Ocurrió un error al configurar las transcripciones: {e}", ephemeral=True)
+            print(f"Error al configurar las transcripciones: {e}")
+
     # --- Comandos para Tipos de Tickets Personalizados ---
     @app_commands.command(name="addtickettype", description="Añade un nuevo tipo de ticket con su categoría de destino y emoji.")
     @app_commands.describe(
@@ -625,8 +1826,8 @@ class Tickets(commands.Cog):
                 return await interaction.followup.send(f"❌ El emoji `{emoji}` no es un emoji de Discord válido al que tenga acceso el bot. Si es un emoji personalizado, asegúrate de que el bot esté en un servidor donde ese emoji exista. Para emojis normales de unicode, puedes copiarlos directamente (ej. `❓`).", ephemeral=True)
 
         try:
-            await self.bot.db.ticket_settings.update_one(
-                {"_id": guild_id},
+            await self.update_ticket_settings(
+                guild_id,
                 {"$set": {
                     f"ticket_types.{name}": {
                         "category_id": category.id,
@@ -651,10 +1852,11 @@ class Tickets(commands.Cog):
 
         guild_id = interaction.guild_id
         
-        result = await self.bot.db.ticket_settings.update_one(
-            {"_id": guild_id},
-            {"$unset": {f"ticket_types.{name}": ""}}
+        result = await self.update_ticket_settings(
+            guild_id,
+            {"$unset": {f"ticket_types.{name}": "", f"ticket_pool_sizes.{name}": ""}}
         )
+        await self.pool.shrink(interaction.guild, name, 0)
 
         if result.modified_count > 0:
             await interaction.followup.send(f"✅ Tipo de ticket `{name}` eliminado correctamente.", ephemeral=True)
@@ -692,6 +1894,107 @@ class Tickets(commands.Cog):
         await interaction.followup.send(embed=embed, ephemeral=True)
 
 
+    @app_commands.command(name="setticketpool", description="Configura cuántos canales pre-creados mantener para un tipo de ticket.")
+    @app_commands.describe(name="Nombre del tipo de ticket.", size=f"Canales ocultos listos para usar (0 desactiva el pool, máximo {MAX_TICKET_POOL_SIZE}).")
+    @app_commands.default_permissions(manage_channels=True)
+    async def set_ticket_pool_slash(self, interaction: discord.Interaction, name: str, size: app_commands.Range[int, 0, MAX_TICKET_POOL_SIZE]):
+        await interaction.response.defer(ephemeral=True)
+        if self.bot.db is None:
+            return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
+
+        settings = await self.get_ticket_settings(interaction.guild_id)
+        config = settings.get("ticket_types", {}).get(name)
+        if not config:
+            return await interaction.followup.send(f"⚠️ No se encontró el tipo de ticket `{name}`.", ephemeral=True)
+        category_id = config.get("category_id") or settings.get("ticket_category_id")
+        category = interaction.guild.get_channel(category_id) if category_id else None
+        if not category:
+            return await interaction.followup.send(f"❌ La categoría del tipo `{name}` no existe. Reconfigúrala con `/addtickettype`.", ephemeral=True)
+
+        try:
+            await self.update_ticket_settings(
+                interaction.guild_id,
+                {"$set": {f"ticket_pool_sizes.{name}": size}},
+                upsert=True
+            )
+            await self.pool.shrink(interaction.guild, name, size)
+            if size:
+                self.pool.refill(interaction.guild, name, category, size)
+                await interaction.followup.send(f"✅ Se mantendrán {size} canales listos para tickets `{name}` en `{category.name}`.", ephemeral=True)
+            else:
+                await interaction.followup.send(f"✅ Pool desactivado para tickets `{name}`.", ephemeral=True)
+        except Exception as e:
+            await interaction.followup.send(f"❌ Ocurrió un error al configurar el pool de tickets: {e}", ephemeral=True)
+            print(f"Error al configurar el pool de tickets: {e}")
+
+    @app_commands.command(name="ticketpoolstats", description="Muestra el estado y los aciertos del pool de canales de tickets.")
+    @app_commands.default_permissions(manage_channels=True)
+    async def ticket_pool_stats_slash(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+        settings = await self.get_ticket_settings(interaction.guild_id)
+        pool_sizes = settings.get("ticket_pool_sizes", {})
+        stats = self.pool.stats(interaction.guild_id)
+
+        if not pool_sizes and not stats:
+            return await interaction.followup.send("ℹ️ No hay pools de canales configurados. Usa `/setticketpool` para crear uno.", ephemeral=True)
+
+        embed = discord.Embed(title="🏊 Pool de Canales de Tickets", color=discord.Color.purple())
+        for ticket_type in sorted(set(pool_sizes) | set(stats)):
+            type_stats = stats.get(ticket_type, {"available": 0, "hits": 0, "misses": 0})
+            total = type_stats["hits"] + type_stats["misses"]
+            hit_rate = f"{type_stats['hits'] / total:.0%}" if total else "N/A"
+            embed.add_field(
+                name=ticket_type,
+                value=f"Disponibles: {type_stats['available']}/{pool_sizes.get(ticket_type, 0)}\n"
+                      f"Aciertos: {type_stats['hits']} | Fallos: {type_stats['misses']}\n"
+                      f"Tasa de acierto: {hit_rate}",
+                inline=True
+            )
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+    @app_commands.command(name="ticketstats", description="Muestra estadísticas de los tickets (aperturas, reclamos, valoraciones).")
+    @app_commands.describe(days=f"Días hacia atrás a incluir (máximo {MAX_TICKET_STATS_DAYS}).", staff="Limitar las estadísticas a un miembro del staff (opcional).")
+    @app_commands.default_permissions(manage_channels=True)
+    async def ticket_stats_slash(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, MAX_TICKET_STATS_DAYS] = 30, staff: discord.Member = None):
+        await interaction.response.defer(ephemeral=True)
+        if self.bot.db is None:
+            return await interaction.followup.send("❌ Error: La base de datos no está conectada.", ephemeral=True)
+
+        summary = await self.analytics.summary(interaction.guild_id, days, staff.id if staff else None)
+        totals = summary["totals"]
+        average_rating = f"{totals['ratings_sum'] / totals['ratings_count']:.2f}/5 ({totals['ratings_count']} valoraciones)" if totals["ratings_count"] else "Sin valoraciones"
+        average_claim = f"{totals['claim_seconds_sum'] / totals['claimed'] / 60:.1f} min" if totals["claimed"] else "N/A"
+        median_claim = summary["median_claim_seconds"]
+        median_claim = f"≤ {median_claim / 60:.0f} min" if median_claim else "N/A"
+
+        embed = discord.Embed(
+            title=f"📊 Estadísticas de Tickets ({days} días)" + (f" - {staff.display_name}" if staff else ""),
+            color=discord.Color.purple()
+        )
+        if not staff:
+            embed.add_field(name="Abiertos", value=totals["opened"], inline=True)
+        embed.add_field(name="Reclamados", value=totals["claimed"], inline=True)
+        embed.add_field(name="Cerrados", value=totals["closed"], inline=True)
+        embed.add_field(name="Valoración Media", value=average_rating, inline=False)
+        embed.add_field(name="Tiempo hasta Reclamar", value=f"Media: {average_claim} | Mediana: {median_claim}", inline=False)
+
+        if not staff and summary["by_type"]:
+            by_type = sorted(summary["by_type"].items(), key=lambda item: item[1], reverse=True)
+            embed.add_field(name="Por Tipo", value="\n".join(f"**{name}**: {count}" for name, count in by_type[:10]), inline=False)
+
+        if not staff and summary["by_staff"]:
+            ranking = sorted(summary["by_staff"].items(), key=lambda item: item[1]["closed"], reverse=True)[:10]
+            lines = []
+            for staff_id, staff_totals in ranking:
+                rating = f"{staff_totals['ratings_sum'] / staff_totals['ratings_count']:.2f}⭐" if staff_totals["ratings_count"] else "sin valoraciones"
+                lines.append(f"<@{staff_id}>: {staff_totals['claimed']} reclamados, {staff_totals['closed']} cerrados, {rating}")
+            embed.add_field(name="Staff", value="\n".join(lines), inline=False)
+
+        embed.timestamp = discord.utils.utcnow()
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
     # --- Comando para enviar el panel de tickets ---
     @app_commands.command(name="sendticketpanel", description="Envía el mensaje del panel de tickets interactivo a un canal.")
     @app_commands.describe(channel="El canal donde se enviará el panel de tickets.", title="Título para el embed del panel (opcional).", description="Descripción para el embed del panel (opcional).")
@@ -736,17 +2039,14 @@ class Tickets(commands.Cog):
         if interaction.guild is None:
             return await interaction.followup.send("Este comando solo puede ser usado en un servidor.", ephemeral=True)
 
-        if not interaction.channel.name.startswith(DEFAULT_TICKET_CHANNEL_PREFIX):
-            return await interaction.followup.send("❌ Este comando solo puede usarse dentro de un canal de ticket.", ephemeral=True)
-        
-        creator_id = None
-        try:
-            parts = interaction.channel.name.split('-')
-            if len(parts) > 1 and parts[-1].isdigit():
-                creator_id = int(parts[-1])
-        except ValueError:
-            pass
-        
+        ticket = await self.registry.get(interaction.channel.id)
+        if ticket is None:
+            # Ticket abierto antes del registro que el backfill aún no ha alcanzado
+            ticket = await self.adopt_legacy_ticket(interaction.channel)
+        if not ticket or ticket.get("status") != "open":
+            return await interaction.followup.send("❌ Este comando solo puede usarse dentro de un canal de ticket abierto.", ephemeral=True)
+
+        creator_id = ticket["creator_id"]
         is_ticket_creator = (creator_id == interaction.user.id)
         
         settings = await self.get_ticket_settings(interaction.guild_id)
@@ -760,11 +2060,12 @@ class Tickets(commands.Cog):
         if not (is_ticket_creator or is_support_member or interaction.user.guild_permissions.manage_channels):
             return await interaction.followup.send("❌ Solo el creador del ticket, un miembro de soporte o un administrador pueden iniciar el cierre de este ticket.", ephemeral=True)
 
-        await interaction.followup.send(f"✅ Proceso de cierre iniciado. El mensaje de valoración aparecerá en este canal.", ephemeral=True)
-        
-        # Iniciar el proceso de valoración en el canal
+        # Iniciar el proceso de valoración en el canal (vuelve de inmediato; el plazo lo gestiona el programador)
         try:
-            await self.handle_ticket_close_initiate_rating(interaction.channel, creator_id, interaction.user)
+            if await self.handle_ticket_close_initiate_rating(interaction.channel, creator_id, interaction.user):
+                await interaction.followup.send(f"✅ Proceso de cierre iniciado. El mensaje de valoración aparecerá en este canal.", ephemeral=True)
+            else:
+                await interaction.followup.send("⚠️ El cierre de este ticket ya está en curso.", ephemeral=True)
         except Exception as e:
             print(f"Error al iniciar valoración desde /close command: {e}")
             await interaction.followup.send(f"❌ Ocurrió un error al iniciar la valoración: {e}", ephemeral=True)
@@ -1,10 +1,349 @@
 import discord
 from discord.ext import commands
+import asyncio
+import time
+import math
+import io
+import functools
+import aiohttp
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageOps
+except ImportError: # Sin Pillow se usa la imagen estática del embed
+    Image = None
+
+# --- Agrupación de bienvenidas en ráfagas de entradas ---
+WELCOME_RATE_WINDOW_SECONDS = 60 # Ventana para medir el ritmo de entradas
+WELCOME_BURST_THRESHOLD = 10 # Entradas por ventana a partir de las cuales se agrupan las bienvenidas
+WELCOME_BATCH_INTERVAL_SECONDS = 10 # Durante una ráfaga se envía un mensaje agrupado cada intervalo
+WELCOME_BATCH_MAX_MENTIONS = 20 # Menciones por mensaje agrupado; el resto se resume como "y N más"
+
+# --- Detector de ráfagas de entradas (anti-raid) ---
+JOIN_FAST_HALF_LIFE_SECONDS = 60 # Contador rápido: entradas "recientes"
+JOIN_BASELINE_HALF_LIFE_SECONDS = 6 * 3600 # Contador lento: ritmo habitual del servidor
+JOIN_LOCKDOWN_MIN_JOINS = 15 # Entradas recientes mínimas para considerar una ráfaga
+JOIN_LOCKDOWN_RATIO = 8 # Veces por encima del ritmo habitual
+JOIN_LOCKDOWN_DURATION_SECONDS = 600 # El bloqueo se prolonga mientras siga la ráfaga
+ACCOUNT_AGE_BUCKETS = [(3600, "< 1 hora"), (86400, "< 1 día"), (7 * 86400, "< 7 días"), (30 * 86400, "< 30 días"), (365 * 86400, "< 1 año"), (None, "≥ 1 año")]
+
+# --- Tarjetas de bienvenida ---
+WELCOME_CARD_SIZE = (1024, 400)
+WELCOME_CARD_AVATAR_SIZE = 220
+WELCOME_CARD_FILENAME = "bienvenida.png"
+WELCOME_CARD_RENDER_WORKERS = 2 # Hilos para componer tarjetas fuera del event loop
+WELCOME_CARD_AVATAR_CACHE_SIZE = 256 # Avatares decodificados en la LRU
+WELCOME_CARD_FETCH_TIMEOUT_SECONDS = 5 # Tiempo máximo para descargar un avatar o fondo
+WELCOME_STATIC_IMAGE_URL = "https://i.imgur.com/your_custom_welcome_image.png" # <<-- ¡CAMBIA ESTA URL!
+
+
+class WelcomeBurstAggregator:
+    """
+    Ritmo de entradas y bienvenidas pendientes de un servidor.
+    Por debajo del umbral cada miembro recibe su embed; por encima, las bienvenidas se acumulan
+    y se envían como un único mensaje por intervalo. Solo se guardan las menciones que se van a
+    mostrar y un contador, así que una ráfaga grande no hace crecer la memoria.
+    """
+    __slots__ = ("joins", "mentions", "pending", "flush_task")
+
+    def __init__(self):
+        self.joins = deque() # Momentos de entrada dentro de la ventana
+        self.mentions = []
+        self.pending = 0
+        self.flush_task = None
+
+    def record_join(self, now):
+        self.joins.append(now)
+        while self.joins and now - self.joins[0] > WELCOME_RATE_WINDOW_SECONDS:
+            self.joins.popleft()
+
+    def in_burst(self):
+        # Mientras queda un lote por enviar se sigue agrupando, para no mezclar órdenes
+        return len(self.joins) >= WELCOME_BURST_THRESHOLD or self.pending > 0
+
+    def add(self, member):
+        if len(self.mentions) < WELCOME_BATCH_MAX_MENTIONS:
+            self.mentions.append(member.mention)
+        self.pending += 1
+
+    def take(self):
+        mentions, pending = self.mentions, self.pending
+        self.mentions, self.pending = [], 0
+        return mentions, pending
+
+
+class JoinRateDetector:
+    """
+    Ritmo de entradas de un servidor con contadores de decaimiento exponencial (O(1) por entrada,
+    memoria constante). Compara el contador rápido con el ritmo habitual y activa un bloqueo
+    ("lockdown") mientras dura la ráfaga. También acumula un histograma de antigüedad de las cuentas
+    que entran durante el bloqueo para el resumen.
+    """
+    __slots__ = ("fast", "baseline", "updated_at", "lockdown_until", "lockdown_started_at", "lockdown_joins", "age_histogram")
+
+    def __init__(self):
+        self.fast = 0.0
+        self.baseline = 0.0
+        self.updated_at = None
+        self.lockdown_until = 0.0
+        self.lockdown_started_at = None
+        self.lockdown_joins = 0
+        self.age_histogram = [0] * len(ACCOUNT_AGE_BUCKETS)
+
+    def _decay(self, now):
+        if self.updated_at is not None:
+            elapsed = now - self.updated_at
+            self.fast *= math.pow(0.5, elapsed / JOIN_FAST_HALF_LIFE_SECONDS)
+            self.baseline *= math.pow(0.5, elapsed / JOIN_BASELINE_HALF_LIFE_SECONDS)
+        self.updated_at = now
+
+    def record_join(self, now, account_age_seconds):
+        """Registra una entrada. Devuelve True si esta entrada inicia un bloqueo."""
+        self._decay(now)
+        # Ritmo habitual escalado a la ventana del contador rápido (antes de sumar esta entrada)
+        expected = self.baseline * JOIN_FAST_HALF_LIFE_SECONDS / JOIN_BASELINE_HALF_LIFE_SECONDS
+        self.fast += 1
+        self.baseline += 1
+
+        started = False
+        if self.fast >= JOIN_LOCKDOWN_MIN_JOINS and self.fast >= JOIN_LOCKDOWN_RATIO * max(expected, 1.0):
+            if not self.is_locked_down(now):
+                started = True
+                self.lockdown_started_at = now
+                self.lockdown_joins = 0
+                self.age_histogram = [0] * len(ACCOUNT_AGE_BUCKETS)
+            self.lockdown_until = now + JOIN_LOCKDOWN_DURATION_SECONDS
+
+        if self.is_locked_down(now):
+            self.lockdown_joins += 1
+            for index, (limit, _) in enumerate(ACCOUNT_AGE_BUCKETS):
+                if limit is None or account_age_seconds < limit:
+                    self.age_histogram[index] += 1
+                    break
+        return started
+
+    def is_locked_down(self, now):
+        return now < self.lockdown_until
+
+
+class WelcomeCardRenderer:
+    """
+    Genera tarjetas de bienvenida (fondo, avatar, nombre y número de miembro) con Pillow.
+    La composición se hace en un ThreadPoolExecutor para no bloquear el event loop durante ráfagas.
+    Los fondos decodificados se cachean por servidor y los avatares en una LRU acotada por hash de avatar.
+    `fetcher` es una corrutina url -> bytes (la del cog, con su sesión HTTP); se puede inyectar otra para probar sin red.
+    """
+    def __init__(self, fetcher, max_workers=WELCOME_CARD_RENDER_WORKERS):
+        self.fetcher = fetcher
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="welcome-card")
+        self.templates = {} # guild_id -> (url del fondo, imagen RGBA ya escalada)
+        self.avatars = OrderedDict() # clave del avatar -> imagen RGBA circular
+        self.default_template = None
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def get_template(self, guild_id, background_url):
+        cached = self.templates.get(guild_id)
+        if cached and cached[0] == background_url:
+            return cached[1]
+        if not background_url:
+            if self.default_template is None:
+                self.default_template = await self._run(self._default_background)
+            return self.default_template
+        template = await self._run(self._decode_background, await self.fetcher(background_url))
+        self.templates[guild_id] = (background_url, template)
+        return template
+
+    def invalidate_template(self, guild_id):
+        self.templates.pop(guild_id, None)
+
+    async def get_avatar(self, member):
+        avatar = member.display_avatar
+        image = self.avatars.get(avatar.key)
+        if image is not None:
+            self.avatars.move_to_end(avatar.key)
+            return image
+        image = await self._run(self._decode_avatar, await self.fetcher(avatar.with_format("png").with_size(256).url))
+        self.avatars[avatar.key] = image
+        if len(self.avatars) > WELCOME_CARD_AVATAR_CACHE_SIZE:
+            self.avatars.popitem(last=False)
+        return image
+
+    async def render(self, member, background_url=None):
+        """Devuelve un discord.File con la tarjeta en PNG (en memoria, sin archivos temporales)."""
+        template = await self.get_template(member.guild.id, background_url)
+        avatar = await self.get_avatar(member)
+        buffer = await self._run(self._compose, template, avatar, member.display_name, member.guild.member_count)
+        return discord.File(buffer, filename=WELCOME_CARD_FILENAME)
+
+    # --- Funciones que se ejecutan en el pool de hilos ---
+    @staticmethod
+    def _default_background():
+        width, height = WELCOME_CARD_SIZE
+        gradient = Image.linear_gradient("L").rotate(90).resize((width, height))
+        return ImageOps.colorize(gradient, "#23272a", "#7289da").convert("RGBA")
+
+    @staticmethod
+    def _decode_background(data):
+        with Image.open(io.BytesIO(data)) as image:
+            return ImageOps.fit(image.convert("RGBA"), WELCOME_CARD_SIZE)
+
+    @staticmethod
+    def _decode_avatar(data):
+        size = (WELCOME_CARD_AVATAR_SIZE, WELCOME_CARD_AVATAR_SIZE)
+        with Image.open(io.BytesIO(data)) as image:
+            avatar = ImageOps.fit(image.convert("RGBA"), size)
+        mask = Image.new("L", size, 0)
+        ImageDraw.Draw(mask).ellipse((0, 0) + size, fill=255)
+        avatar.putalpha(mask)
+        return avatar
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _load_font(size):
+        try:
+            return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
+        except OSError:
+            return ImageFont.load_default(size=size)
+
+    @classmethod
+    def _compose(cls, template, avatar, display_name, member_number):
+        card = template.copy()
+        width, height = card.size
+        avatar_x = 60
+        avatar_y = (height - avatar.height) // 2
+        draw = ImageDraw.Draw(card)
+        draw.ellipse((avatar_x - 6, avatar_y - 6, avatar_x + avatar.width + 6, avatar_y + avatar.height + 6), fill="white")
+        card.alpha_composite(avatar, (avatar_x, avatar_y))
+
+        text_x = avatar_x + avatar.width + 50
+        draw.text((text_x, height // 2 - 90), "¡BIENVENIDO!", font=cls._load_font(40), fill="#dbdee1")
+        name = display_name if len(display_name) <= 22 else display_name[:21] + "…"
+        draw.text((text_x, height // 2 - 35), name, font=cls._load_font(56), fill="white")
+        draw.text((text_x, height // 2 + 45), f"Miembro #{member_number}", font=cls._load_font(34), fill="#b9bbbe")
+
+        buffer = io.BytesIO()
+        card.convert("RGB").save(buffer, format="PNG", optimize=False)
+        buffer.seek(0)
+        return buffer
+
 
 # Definimos una clase que hereda de commands.Cog
 class Welcome(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.settings_cache = {} # guild_id -> documento de welcome_settings (o {} si no hay)
+        self.aggregators = {} # guild_id -> WelcomeBurstAggregator
+        self.http_session = None # Sesión HTTP compartida para descargar avatares y fondos; se crea al primer uso
+        self.card_renderer = WelcomeCardRenderer(self.fetch_url_bytes) if Image is not None else None
+        self.join_detectors = {} # guild_id -> JoinRateDetector
+        self.lockdown_watchers = {} # guild_id -> tarea de watch_lockdown en curso
+
+    async def cog_unload(self):
+        if self.card_renderer:
+            self.card_renderer.close()
+        if self.http_session:
+            await self.http_session.close()
+        for watcher in self.lockdown_watchers.values():
+            watcher.cancel()
+        for aggregator in self.aggregators.values():
+            if aggregator.flush_task:
+                aggregator.flush_task.cancel()
+
+    async def fetch_url_bytes(self, url):
+        """Descargador de avatares y fondos. Reutiliza una sola sesión con un tiempo máximo corto."""
+        if self.http_session is None or self.http_session.closed:
+            self.http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=WELCOME_CARD_FETCH_TIMEOUT_SECONDS))
+        async with self.http_session.get(url) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def get_welcome_settings(self, guild_id):
+        """Configuración de bienvenida cacheada; `set_bienvenida` invalida la entrada."""
+        settings = self.settings_cache.get(guild_id)
+        if settings is None:
+            settings = await self.bot.db.welcome_settings.find_one({"_id": guild_id}) or {}
+            self.settings_cache[guild_id] = settings
+        return settings
+
+    def is_locked_down(self, guild_id):
+        """
+        Indica si el servidor está recibiendo una ráfaga anómala de entradas.
+        Otros cogs pueden consultarlo sin coste: bot.get_cog("Welcome").is_locked_down(guild_id)
+        """
+        detector = self.join_detectors.get(guild_id)
+        return detector is not None and detector.is_locked_down(time.monotonic())
+
+    def track_join(self, member):
+        detector = self.join_detectors.get(member.guild.id)
+        if detector is None:
+            detector = self.join_detectors[member.guild.id] = JoinRateDetector()
+        account_age = (discord.utils.utcnow() - member.created_at).total_seconds()
+        if detector.record_join(time.monotonic(), account_age):
+            print(f"LOCKDOWN activado en el servidor '{member.guild.name}' ({member.guild.id}) por una ráfaga de entradas.")
+            watcher = self.lockdown_watchers.get(member.guild.id)
+            if watcher is None or watcher.done():
+                self.lockdown_watchers[member.guild.id] = asyncio.create_task(self.watch_lockdown(member.guild, detector))
+
+    async def get_alert_channel(self, guild):
+        """Canal de logs de bienvenida, o el canal de logs de moderación si no hay uno propio."""
+        channel_id = None
+        if self.bot.db is not None:
+            channel_id = (await self.get_welcome_settings(guild.id)).get("log_channel_id")
+        if not channel_id:
+            moderation = self.bot.get_cog("Moderation")
+            if moderation:
+                channel_id = (await moderation.get_moderation_settings(guild.id)).get("log_channel_id")
+        return guild.get_channel(channel_id) if channel_id else None
+
+    async def watch_lockdown(self, guild, detector):
+        """
+        Avisa al inicio del bloqueo y publica un único resumen cuando termina. Hay como mucho un vigilante
+        por servidor; si empieza otro bloqueo mientras se envía el resumen, el mismo vigilante lo sigue.
+        """
+        while True:
+            log_channel = await self.get_alert_channel(guild)
+            if log_channel:
+                embed = discord.Embed(
+                    title="🚨 Ráfaga de Entradas Detectada",
+                    description=f"El ritmo de entradas supera {JOIN_LOCKDOWN_RATIO} veces el habitual. El servidor queda en **lockdown** mientras dure la ráfaga; se publicará un resumen al terminar.",
+                    color=discord.Color.dark_red()
+                )
+                embed.timestamp = discord.utils.utcnow()
+                try:
+                    await log_channel.send(embed=embed)
+                except Exception as e:
+                    print(f"ERROR al enviar aviso de lockdown: {e}")
+
+            while detector.is_locked_down(time.monotonic()):
+                await asyncio.sleep(detector.lockdown_until - time.monotonic())
+
+            duration = int(detector.lockdown_until - detector.lockdown_started_at - JOIN_LOCKDOWN_DURATION_SECONDS)
+            print(f"LOCKDOWN terminado en el servidor '{guild.name}' ({guild.id}): {detector.lockdown_joins} entradas.")
+            if log_channel:
+                histogram = "\n".join(
+                    f"`{label:>10}` {count}" for (_, label), count in zip(ACCOUNT_AGE_BUCKETS, detector.age_histogram) if count
+                )
+                embed = discord.Embed(
+                    title="✅ Fin de la Ráfaga de Entradas",
+                    description=f"**{detector.lockdown_joins}** miembros entraron desde que se activó el lockdown (duración aproximada: {max(duration, 0) // 60} min).",
+                    color=discord.Color.orange()
+                )
+                embed.add_field(name="Antigüedad de las Cuentas", value=histogram or "Sin datos", inline=False)
+                embed.add_field(name="Miembros Actualmente", value=str(guild.member_count), inline=True)
+                embed.timestamp = discord.utils.utcnow()
+                try:
+                    await log_channel.send(embed=embed)
+                except Exception as e:
+                    print(f"ERROR al enviar resumen de lockdown: {e}")
+
+            if not detector.is_locked_down(time.monotonic()):
+                return
 
     # --- Posible Error 1: `discord.Intents.members` no habilitado o `member.avatar` / `member.default_avatar` ---
     # Si ves un error relacionado con 'NoneType' object has no attribute 'url'
@@ -16,19 +355,19 @@ class Welcome(commands.Cog):
     async def on_member_join(self, member):
         """
         Este evento se activa cuando un nuevo miembro se une al servidor.
-        Envía un mensaje de bienvenida personalizado en el canal configurado.
+        Envía un mensaje de bienvenida personalizado en el canal configurado,
+        o lo agrupa con otras entradas si el servidor está recibiendo una ráfaga.
         """
+        self.track_join(member)
+
         if self.bot.db is None:
             print("Error: La base de datos no está conectada para el evento on_member_join.")
             return
 
         guild_id = member.guild.id
 
-        settings = await self.bot.db.welcome_settings.find_one({"_id": guild_id})
-
-        welcome_channel_id = None
-        if settings:
-            welcome_channel_id = settings.get("channel_id")
+        settings = await self.get_welcome_settings(guild_id)
+        welcome_channel_id = settings.get("channel_id")
 
         if not welcome_channel_id:
             print(f"No hay un canal de bienvenida configurado para el servidor '{member.guild.name}' ({guild_id}).")
@@ -40,24 +379,53 @@ class Welcome(commands.Cog):
             print(f"El canal de bienvenida configurado ({welcome_channel_id}) para el servidor '{member.guild.name}' no se encontró o el bot no tiene acceso.")
             return
 
-        member_count = len(member.guild.members)
+        aggregator = self.aggregators.get(guild_id)
+        if aggregator is None:
+            aggregator = self.aggregators[guild_id] = WelcomeBurstAggregator()
+        aggregator.record_join(time.monotonic())
+
+        if aggregator.in_burst():
+            aggregator.add(member)
+            if aggregator.flush_task is None or aggregator.flush_task.done():
+                aggregator.flush_task = asyncio.create_task(self.flush_welcome_batches(member.guild, aggregator))
+            return
+
+        embed = self.build_welcome_embed(member)
+        card = None
+        if self.card_renderer and not self.is_locked_down(guild_id): # Durante un lockdown no se gastan recursos en tarjetas
+            try:
+                card = await self.card_renderer.render(member, settings.get("card_background_url"))
+                embed.set_image(url=f"attachment://{WELCOME_CARD_FILENAME}")
+            except Exception as e:
+                print(f"Error al generar la tarjeta de bienvenida para {member.name}: {e}")
+        try:
+            await welcome_channel.send(embed=embed, file=card) if card else await welcome_channel.send(embed=embed)
+            print(f"Mensaje de bienvenida enviado para {member.name} en el servidor '{member.guild.name}'.")
+        except discord.Forbidden:
+            print(f"El bot no tiene permisos para enviar mensajes en el canal {welcome_channel.name} ({welcome_channel.id}) del servidor '{member.guild.name}'.")
+        except Exception as e:
+            print(f"Ocurrió un error al enviar el mensaje de bienvenida: {e}")
+
+    def build_welcome_embed(self, member):
+        # member_count es O(1); len(guild.members) construye la lista completa de miembros
+        member_count = member.guild.member_count
 
         embed = discord.Embed(
             title=f"🎉 ¡Bienvenido a {member.guild.name}!",
             description=f"¡Hola {member.mention}! Nos alegra tenerte aquí.",
             color=0x7289DA
         )
-        
+
         # --- Posible Error 2: La URL de la imagen de bienvenida ---
         # Si la imagen no se muestra o hay un error al cargar el embed,
         # asegúrate de que la URL sea directamente a la imagen (termina en .png, .jpg, .gif, etc.)
         # y que el bot pueda acceder a ella.
-        # Por favor, reemplaza esta URL con la tuya.
-        embed.set_image(url="https://i.imgur.com/your_custom_welcome_image.png") # <<-- ¡CAMBIA ESTA URL!
+        # Por favor, reemplaza esta URL con la tuya. Con Pillow instalado se sustituye por la tarjeta generada.
+        embed.set_image(url=WELCOME_STATIC_IMAGE_URL)
 
         # Asegurarse de usar discord.utils.utcnow() para timestamps
         embed.timestamp = discord.utils.utcnow()
-        
+
         # --- Posible Error 3: Permisos del Bot o Error con set_thumbnail ---
         # Si el bot no tiene permisos de `Read Message History` o `View Channel`
         # en el canal de bienvenida, no podrá enviar el mensaje.
@@ -76,14 +444,39 @@ class Welcome(commands.Cog):
 
         embed.add_field(name="Miembros Actualmente", value=f"Somos **{member_count}** miembros en el servidor.", inline=False)
         embed.set_footer(text="¡Esperamos que disfrutes tu estancia!")
-        
-        try:
-            await welcome_channel.send(embed=embed)
-            print(f"Mensaje de bienvenida enviado para {member.name} en el servidor '{member.guild.name}'.")
-        except discord.Forbidden:
-            print(f"El bot no tiene permisos para enviar mensajes en el canal {welcome_channel.name} ({welcome_channel.id}) del servidor '{member.guild.name}'.")
-        except Exception as e:
-            print(f"Ocurrió un error al enviar el mensaje de bienvenida: {e}")
+        return embed
+
+    async def flush_welcome_batches(self, guild, aggregator):
+        """Envía un mensaje agrupado por intervalo mientras haya bienvenidas pendientes."""
+        while aggregator.pending:
+            await asyncio.sleep(WELCOME_BATCH_INTERVAL_SECONDS)
+            mentions, pending = aggregator.take()
+            if not pending:
+                break
+
+            settings = await self.get_welcome_settings(guild.id)
+            welcome_channel = self.bot.get_channel(settings.get("channel_id")) if settings.get("channel_id") else None
+            if welcome_channel is None:
+                continue
+
+            others = pending - len(mentions)
+            description = f"¡Hola {', '.join(mentions)}" + (f" y **{others}** más" if others > 0 else "") + "! Nos alegra teneros aquí."
+            embed = discord.Embed(
+                title=f"🎉 ¡Bienvenidos a {guild.name}!",
+                description=description,
+                color=0x7289DA
+            )
+            embed.add_field(name="Miembros Actualmente", value=f"Somos **{guild.member_count}** miembros en el servidor.", inline=False)
+            embed.set_footer(text="¡Esperamos que disfrutéis vuestra estancia!")
+            embed.timestamp = discord.utils.utcnow()
+
+            try:
+                await welcome_channel.send(embed=embed)
+                print(f"Bienvenida agrupada enviada para {pending} miembros en el servidor '{guild.name}'.")
+            except discord.Forbidden:
+                print(f"El bot no tiene permisos para enviar mensajes en el canal {welcome_channel.name} ({welcome_channel.id}) del servidor '{guild.name}'.")
+            except Exception as e:
+                print(f"Ocurrió un error al enviar la bienvenida agrupada: {e}")
 
     @commands.command(name='setbienvenida')
     @commands.has_permissions(administrator=True)
@@ -105,11 +498,68 @@ class Welcome(commands.Cog):
                 {"$set": {"channel_id": channel_id}},
                 upsert=True
             )
+            self.settings_cache.pop(guild_id, None)
             await ctx.send(f"✅ ¡El canal de bienvenida se ha configurado a {channel.mention} con éxito!")
             print(f"Canal de bienvenida configurado a {channel.name} ({channel.id}) para el servidor '{ctx.guild.name}'.")
         except Exception as e:
             await ctx.send(f"❌ Ocurrió un error al configurar el canal de bienvenida: {e}")
             print(f"Error al configurar el canal de bienvenida: {e}")
 
+    @commands.command(name='setlogbienvenida')
+    @commands.has_permissions(administrator=True)
+    async def set_log_bienvenida(self, ctx, channel: discord.TextChannel):
+        """
+        Configura el canal donde se publican los avisos y resúmenes de ráfagas de entradas.
+        Uso: !setlogbienvenida #nombre-del-canal
+        """
+        if self.bot.db is None:
+            await ctx.send("❌ Error: La base de datos no está conectada. No se pudo configurar el canal.")
+            return
+
+        try:
+            await self.bot.db.welcome_settings.update_one(
+                {"_id": ctx.guild.id},
+                {"$set": {"log_channel_id": channel.id}},
+                upsert=True
+            )
+            self.settings_cache.pop(ctx.guild.id, None)
+            await ctx.send(f"✅ ¡Los avisos de ráfagas de entradas se enviarán a {channel.mention}!")
+        except Exception as e:
+            await ctx.send(f"❌ Ocurrió un error al configurar el canal de avisos: {e}")
+            print(f"Error al configurar el canal de avisos de bienvenida: {e}")
+
+    @commands.command(name='setfondobienvenida')
+    @commands.has_permissions(administrator=True)
+    async def set_fondo_bienvenida(self, ctx, url: str = None):
+        """
+        Configura la imagen de fondo de las tarjetas de bienvenida (sin URL vuelve al fondo por defecto).
+        Uso: !setfondobienvenida https://ejemplo.com/fondo.png
+        """
+        if self.bot.db is None:
+            await ctx.send("❌ Error: La base de datos no está conectada. No se pudo configurar el fondo.")
+            return
+
+        if url and self.card_renderer:
+            try:
+                # Validar la imagen antes de guardarla (queda cacheada para la siguiente bienvenida)
+                await self.card_renderer.get_template(ctx.guild.id, url)
+            except Exception as e:
+                await ctx.send(f"❌ No se pudo cargar la imagen de fondo: {e}")
+                return
+
+        try:
+            await self.bot.db.welcome_settings.update_one(
+                {"_id": ctx.guild.id},
+                {"$set": {"card_background_url": url}},
+                upsert=True
+            )
+            self.settings_cache.pop(ctx.guild.id, None)
+            if not url and self.card_renderer:
+                self.card_renderer.invalidate_template(ctx.guild.id)
+            await ctx.send("✅ ¡Fondo de las tarjetas de bienvenida actualizado!" if url else "✅ Se usará el fondo por defecto en las tarjetas de bienvenida.")
+        except Exception as e:
+            await ctx.send(f"❌ Ocurrió un error al configurar el fondo de bienvenida: {e}")
+            print(f"Error al configurar el fondo de bienvenida: {e}")
+
 async def setup(bot):
-    await bot.add_cog(Welcome(bot))
\ No newline at end of file
+    await bot.add_cog(Welcome(bot))
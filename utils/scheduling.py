@@ -0,0 +1,88 @@
+import asyncio
+import heapq
+import time
+import datetime
+
+DEADLINE_CALLBACK_CONCURRENCY = 10 # Callbacks de plazos vencidos ejecutándose a la vez por programador
+
+
+def as_utc(moment):
+    """Motor devuelve datetimes sin zona horaria (en UTC): les añade la zona para poder compararlos."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment
+
+
+class DeadlineScheduler:
+    """
+    Un único temporizador para muchos plazos. Cada clave tiene como mucho un plazo vigente: programarla
+    de nuevo reemplaza el anterior. Los plazos viven en un heap y una sola tarea duerme hasta el próximo;
+    al vencer se lanza `callback(clave)` en su propia tarea (como mucho `concurrency` a la vez), así que un
+    callback lento no retrasa los demás plazos. Las entradas canceladas o reemplazadas se descartan al salir del heap.
+    """
+    def __init__(self, bot, callback, name, concurrency=DEADLINE_CALLBACK_CONCURRENCY):
+        self.bot = bot
+        self.callback = callback
+        self.name = name # Solo para los logs
+        self.heap = []
+        self.pending = {} # clave -> timestamp del plazo vigente
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.running = set() # Tareas de callbacks en curso
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+        for task in self.running:
+            task.cancel()
+
+    def schedule(self, key, due_at):
+        due_ts = as_utc(due_at).timestamp()
+        self.pending[key] = due_ts
+        heapq.heappush(self.heap, (due_ts, key))
+        if self.heap[0][0] == due_ts:
+            self.wakeup.set() # Hay un plazo más próximo: despertar al temporizador
+
+    def cancel(self, key):
+        self.pending.pop(key, None) # La entrada del heap se descarta al vencer
+
+    def is_scheduled(self, key):
+        return key in self.pending
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+
+            due_ts, key = self.heap[0]
+            delay = due_ts - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self.heap)
+            if self.pending.get(key) != due_ts:
+                continue # Plazo obsoleto o cancelado
+            del self.pending[key]
+
+            # El bucle del heap no espera al callback
+            task = asyncio.create_task(self._fire(key))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _fire(self, key):
+        async with self.semaphore:
+            try:
+                await self.callback(key)
+            except Exception as e:
+                print(f"ERROR al procesar el plazo {key} ({self.name}): {e}")